@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import logging
+from app.models import BatchStatus, Principal
+from app.models.task import TranscriptionBatch
+from app.services import auth, batches
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+async def owned_batch(
+    batch_id: str,
+    principal: Optional[Principal] = Depends(auth.optional_principal)
+) -> TranscriptionBatch:
+    batch = await batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    auth.check_owner(batch.user_id, principal)
+    return batch
+
+# The form is parsed from the raw body, so describe it for the OpenAPI docs
+BATCH_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["files"],
+            "properties": {
+                "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                "language": {"type": "string"},
+                "prompt": {"type": "string"},
+            },
+        }}},
+    }
+}
+
+@router.post("/transcribe/batches/", response_model=BatchStatus, status_code=202, openapi_extra=BATCH_FORM)
+async def create_batch(
+    request: Request,
+    principal: Optional[Principal] = Depends(auth.optional_principal)
+):
+    """
+    Queue many video/audio files, or ZIP archives of them, for transcription.
+    Follow /transcribe/batches/{batch_id}/events or poll /transcribe/batches/{batch_id}.
+    """
+    form = await batches.receive(request)
+    logger.info(f"Received batch of {len(form.files)} uploads")
+    return await batches.create(
+        form.files,
+        user_id=principal.user_id if principal else None,
+        language=form.field("language"),
+        prompt=form.field("prompt")
+    )
+
+@router.get("/transcribe/batches/{batch_id}", response_model=BatchStatus)
+async def get_batch(batch: TranscriptionBatch = Depends(owned_batch)):
+    """Status of every file in the batch and counts by status"""
+    return await batches.status(batch.id)
+
+@router.get("/transcribe/batches/{batch_id}/events")
+async def batch_events(batch: TranscriptionBatch = Depends(owned_batch)):
+    """Server-Sent Events: a file event per finished file, then a done event"""
+    return StreamingResponse(
+        batches.events(batch.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Request, Form, Depends, Response
+from fastapi import APIRouter, HTTPException, Request, Form, Depends, Query, Response
 from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -11,16 +11,10 @@ from enum import Enum
 from app.db import get_db
 from app.models.transcription import Transcription
 from app.models.user import User
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from io import BytesIO
 import re
-import requests
+import asyncio
 import os
-from openai import OpenAI
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+from app.services import artifacts, auth, export_cache, metrics, openai_client, rendering, segments, transcripts
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -30,39 +24,130 @@ class DocumentFormat(str, Enum):
     DOCX = "docx"
     PDF = "pdf"
     HTML = "html"
+    SRT = "srt"
+    VTT = "vtt"
 
+# Rendered formats: media type and download name
+EXPORT_MEDIA_TYPES = {
+    DocumentFormat.DOCX: ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "gft_transcription.docx"),
+    DocumentFormat.PDF: ("application/pdf", "gft_transcription.pdf"),
+    DocumentFormat.HTML: ("text/html", "gft_transcription.html"),
+    DocumentFormat.SRT: ("application/x-subrip", "gft_transcription.srt"),
+    DocumentFormat.VTT: ("text/vtt", "gft_transcription.vtt"),
+}
 
+# Subtitle formats, rendered from the stored segment timestamps
+SUBTITLE_RENDERERS = {
+    DocumentFormat.SRT: document_converter.iter_srt,
+    DocumentFormat.VTT: document_converter.iter_vtt,
+}
+
+
+
+# Heading for a leading chunk the model failed to section
+UNSECTIONED_TITLE = "Transcripción"
+
+# Paragraph breaks and sentence ends, kept as separators when chunking
+CHUNK_BOUNDARY = re.compile(r"(\n+|(?<=[.!?…])\s+)")
 
 def chunk_text(text, max_length=2000):
-    """Split text into chunks of max_length (in characters)."""
-    paragraphs = text.split('\n')
+    """
+    Split text into chunks of at most max_length characters, breaking at
+    paragraphs, then sentences, then words. Separators stay attached to
+    the chunk they end, so "".join(chunk_text(text)) == text.
+    """
+    parts = CHUNK_BOUNDARY.split(text)
+    units = [parts[i] + (parts[i + 1] if i + 1 < len(parts) else "") for i in range(0, len(parts), 2)]
+
     chunks = []
     current_chunk = ""
-    for para in paragraphs:
-        if len(current_chunk) + len(para) + 1 > max_length:
-            chunks.append(current_chunk)
-            current_chunk = para
-        else:
-            if current_chunk:
-                current_chunk += "\n" + para
+    for unit in units:
+        # A single sentence longer than a chunk is split between words
+        pieces = re.findall(r"\S+\s*|\s+", unit) if len(unit) > max_length else [unit]
+        for piece in pieces:
+            if current_chunk and len(current_chunk) + len(piece) > max_length:
+                chunks.append(current_chunk)
+                current_chunk = piece
             else:
-                current_chunk = para
+                current_chunk += piece
     if current_chunk:
         chunks.append(current_chunk)
     return chunks
 
-def humanize_with_gpt35(text, language="es"):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set in environment variables")
-    client = OpenAI(api_key=api_key)
+async def map_chunks(func, text, language, max_length, memo=None):
+    """
+    Run func(chunk, language) on every chunk of text concurrently, at most
+    LLM_CHUNK_CONCURRENCY at a time, and return (chunks, results) in order.
+    memo maps artifacts.chunk_key(chunk) to a previous result; chunks found
+    there are not sent again, and it is left holding this text's chunks.
+    """
+    chunks = chunk_text(text, max_length)
+    slots = asyncio.Semaphore(config.LLM_CHUNK_CONCURRENCY)
+    memo = {} if memo is None else memo
+
+    async def run(chunk):
+        if not chunk.strip():
+            return chunk
+        key = artifacts.chunk_key(chunk)
+        if key in memo:
+            return memo[key]
+        async with slots:
+            return await func(chunk, language)
+
+    results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    memo.clear()
+    memo.update((artifacts.chunk_key(chunk), result) for chunk, result in zip(chunks, results))
+    return chunks, results
+
+@metrics.timed("correction")
+async def correct_text(text, language="es", memo=None):
+    """Grammar-correct text chunk by chunk and reassemble it in order"""
+    chunks, results = await map_chunks(humanize_with_gpt35, text, language, config.LLM_CHUNK_SIZE, memo)
+    corrected = []
+    for chunk, result in zip(chunks, results):
+        # If empty or too short, the model truncated or summarized: keep the original chunk
+        if not result or len(result) < len(chunk.strip()) * 0.8:
+            logger.warning("Using original text for a chunk - AI result seems incomplete")
+            result = chunk.strip()
+        corrected.append(result + chunk[len(chunk.rstrip()):])
+    corrected = "".join(corrected)
+    metrics.record_bytes("correction", len(text.encode()), len(corrected.encode()))
+    return corrected
+
+@metrics.timed("sectioning")
+async def section_text(text, language="es", memo=None):
+    """Split text into titled sections, one LLM call per chunk"""
+    chunks, results = await map_chunks(section_and_title_with_gpt35, text, language, config.LLM_SECTION_CHUNK_SIZE, memo)
+    sections = []
+    for chunk, result in zip(chunks, results):
+        if not chunk.strip():
+            continue
+        # If empty or too short, the model truncated or summarized: keep the
+        # original chunk, under the previous section's title
+        if not result.strip() or len(result) < len(chunk.strip()) * 0.8:
+            logger.warning("Using original text for a chunk - AI sectioning seems incomplete")
+            result = chunk.strip() if sections else f"[{UNSECTIONED_TITLE}]\n{chunk.strip()}"
+        sections.append(result.strip())
+    sectioned = "\n\n".join(sections)
+    metrics.record_bytes("sectioning", len(text.encode()), len(sectioned.encode()))
+    return sectioned
+
+def reply_text(response):
+    """The model's reply, or "" when it stopped at max_tokens and is cut short"""
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        logger.warning("LLM reply hit max_tokens - discarding truncated output")
+        return ""
+    return choice.message.content.strip()
+
+async def humanize_with_gpt35(text, language="es"):
     prompt = (
         f"Corrige solamente la gramática y puntuación en el siguiente texto en {language}. "
         "NO añadas texto propio. NO resumas. NO cambies palabras. NO agregues comentarios. "
         "SOLO corrige errores gramaticales, puntuación y capitalización:\n\n"
         + text
     )
-    response = client.chat.completions.create(
+    response = await openai_client.chat(
         model="gpt-3.5-turbo",
         messages=[
             {"role": "system", "content": "Eres un corrector ortográfico profesional."},
@@ -71,13 +156,9 @@ def humanize_with_gpt35(text, language="es"):
         max_tokens=2048,
         temperature=0.0,
     )
-    return response.choices[0].message.content.strip()
+    return reply_text(response)
 
-def section_and_title_with_gpt35(text, language="es"):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set in environment variables")
-    client = OpenAI(api_key=api_key)
+async def section_and_title_with_gpt35(text, language="es"):
     prompt = (
         f"Divide el siguiente texto en secciones lógicas. "
         "Para cada sección, genera un título breve y descriptivo (máximo 8 palabras), y coloca el texto de esa sección debajo del título. "
@@ -87,7 +168,7 @@ def section_and_title_with_gpt35(text, language="es"):
         "No agregues comentarios ni texto adicional.\n\n"
         + text
     )
-    response = client.chat.completions.create(
+    response = await openai_client.chat(
         model="gpt-3.5-turbo",
         messages=[
             {"role": "system", "content": "Eres un editor profesional de textos."},
@@ -96,170 +177,154 @@ def section_and_title_with_gpt35(text, language="es"):
         max_tokens=2048,
         temperature=0.3,
     )
-    return response.choices[0].message.content.strip()
-
-def add_toc(paragraph):
-    fldSimple = OxmlElement('w:fldSimple')
-    fldSimple.set(qn('w:instr'), 'TOC \\o "1-3" \\h \\z \\u')
-    paragraph._p.append(fldSimple)
+    return reply_text(response)
 
-@router.get("/download/{file_id}")
-async def download_transcription(file_id: str):
-    file_path = config.RESULTS_DIR / f"{file_id}.txt"
-    if not file_path.exists():
+@router.get("/download/{file_id}", dependencies=[Depends(auth.authorize_transcript)])
+async def download_transcription(file_id: str, request: Request):
+    file_path = await transcripts.materialize(file_id)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="Transcription not found")
-    return FileResponse(
-        path=str(file_path),
+    text_hash = await asyncio.to_thread(artifacts.content_hash, file_path)
+    etag = export_cache.make_etag(text_hash)
+    last_modified = file_path.stat().st_mtime
+    if export_cache.is_not_modified(request, etag, last_modified):
+        return export_cache.not_modified_response(etag, last_modified)
+    return export_cache.file_response(
+        file_path, etag, last_modified,
         filename=f"transcription_{file_id}.txt",
         media_type="text/plain"
     )
 
-@router.get("/export/{file_id}")
+@router.get("/export/{file_id}", dependencies=[Depends(auth.authorize_transcript)])
 async def export_transcription(
     file_id: str,
     format: str,
-    language: str = "es",  # <-- Default to Spanish
+    request: Request,
+    language: str = Query("es", pattern=artifacts.LANGUAGE_PATTERN),  # <-- Default to Spanish
     db: AsyncSession = Depends(get_db)
 ):
-    txt_path = config.RESULTS_DIR / f"{file_id}.txt"
-    if not txt_path.exists():
+    txt_path = await transcripts.materialize(file_id)
+    if txt_path is None:
         raise HTTPException(status_code=404, detail="Transcription not found")
-    with open(txt_path, 'r') as f:
-        transcription_text = f.read()
 
-    # Clean/humanize the transcription here
-    corrected_text = humanize_with_gpt35(transcription_text, language)
+    # Validators depend only on the transcript version, so repeated
+    # downloads are answered before any LLM call or rendering
+    text_hash = await asyncio.to_thread(artifacts.content_hash, txt_path)
+    last_modified = txt_path.stat().st_mtime
+
+    if format in SUBTITLE_RENDERERS:
+        return await export_subtitles(file_id, format, request)
 
-    # If empty or too short, use original
-    if not corrected_text or len(corrected_text) < len(transcription_text) * 0.8:
-        print("Warning: Using original text - AI result seems incomplete")
-        corrected_text = transcription_text
+    if format not in (DocumentFormat.DOCX, DocumentFormat.PDF, DocumentFormat.HTML):
+        etag = export_cache.make_etag(text_hash)
+        if export_cache.is_not_modified(request, etag, last_modified):
+            return export_cache.not_modified_response(etag, last_modified)
+        return export_cache.file_response(
+            txt_path, etag, last_modified,
+            filename="gft_transcription.txt",
+            media_type="text/plain"
+        )
+
+    media_type, download_name = EXPORT_MEDIA_TYPES[format]
+    key = export_cache.cache_key(file_id, format, language, text_hash)
+    etag = export_cache.make_etag(key)
+    if export_cache.is_not_modified(request, etag, last_modified):
+        return export_cache.not_modified_response(etag, last_modified)
+    cached_path = export_cache.lookup(key, format)
+    if cached_path:
+        return export_cache.file_response(cached_path, etag, last_modified, download_name, media_type)
+
+    with open(txt_path, 'r') as f:
+        transcription_text = f.read()
 
-    print("Transcription after Llama3:", corrected_text)
+    # Clean/humanize the transcription here, in parallel chunks so long
+    # transcripts are not truncated by max_tokens. The result is stored, so
+    # exporting the same text in another format skips the LLM, and after an
+    # edit only the changed chunks are sent again
+    corrected_text = await artifacts.get_or_create(
+        file_id, artifacts.CORRECTED, language, text_hash,
+        lambda memo: correct_text(transcription_text, language, memo)
+    )
 
     if not corrected_text.strip():
         corrected_text = "No se pudo procesar la transcripción."
 
-    output_filename = f"{file_id}.{format}"
-    output_path = config.RESULTS_DIR / output_filename
+    if format == DocumentFormat.HTML:
+        # HTML renders incrementally: the first bytes reach the client
+        # while the rest is generated and written to the cache
+        return export_cache.stream_response(
+            document_converter.iter_html(corrected_text),
+            key, format, etag, last_modified, download_name, media_type
+        )
 
+    # DOCX and PDF are rendered to a file, then streamed from disk in chunks
+    output_path = export_cache.pending_path(key, format)
     if format == DocumentFormat.DOCX:
-        doc = Document()
-
-        # --- COVER PAGE (Section 1, margins 0) ---
-        section = doc.sections[0]
-        section.top_margin = Inches(0)
-        section.bottom_margin = Inches(0)
-        section.left_margin = Inches(0)
-        section.right_margin = Inches(0)
-
-        # Añade la imagen de portada
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.add_run()
-        run.add_picture('images/cover.png', width=Inches(8.27), height=Inches(10.5))
-
-        # Añade un párrafo vacío después de la imagen (opcional)
-        doc.add_paragraph("")
-
-        # Añade el salto de página SOLO después de tener contenido
-        doc.add_page_break()
-
-        # Añade una nueva sección para el contenido principal
-        from docx.enum.section import WD_SECTION
-        doc.add_section(WD_SECTION.NEW_PAGE)
-
-        # Ahora puedes acceder a la sección 1 (índice 1)
-        main_section = doc.sections[1]
-        main_section.top_margin = Inches(1)
-        main_section.bottom_margin = Inches(1)
-        main_section.left_margin = Inches(1)
-        main_section.right_margin = Inches(1)
-
-        # Añade el logo en el header de la sección principal
-        header = main_section.header
-        header_paragraph = header.paragraphs[0]
-        header_run = header_paragraph.add_run()
-        header_run.add_picture('images/GFT_Logo_RGB.png', width=Inches(1.0))
-
-        # Table of Contents
-        doc.add_paragraph('Tabla de Contenidos', style='Heading 1')
-        toc_paragraph = doc.add_paragraph()
-        add_toc(toc_paragraph)
-        doc.add_page_break()
-
         # --- Sectioned Content ---
-        sectioned_text = section_and_title_with_gpt35(corrected_text, language)
-
-        # Parse sections: [TITLE]\nText...
-        pattern = re.compile(r"\[(.*?)\]\n(.*?)(?=\n\[|$)", re.DOTALL)
-        matches = pattern.findall(sectioned_text)
-
-        if not matches:
-            # fallback: just add the text as a single section
-            doc.add_heading('Transcripción de Video', level=1)
-            paragraph = doc.add_paragraph(sectioned_text or "Sin texto")
-            paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-            for run in paragraph.runs:
-                run.font.name = 'Noto Sans'
-                run.font.size = Pt(12)
-        else:
-            for title, content in matches:
-                heading = doc.add_heading(title.strip(), level=1)
-                heading.runs[0].font.name = 'Arial'
-                heading.runs[0].font.size = Pt(18)
-                paragraph = doc.add_paragraph(content.strip())
-                paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-                for run in paragraph.runs:
-                    run.font.name = 'Noto Sans'
-                    run.font.size = Pt(12)
-
-        file_stream = BytesIO()
-        doc.save(file_stream)
-        file_stream.seek(0)
-        headers = {
-            "Content-Disposition": f"attachment; filename=gft_transcription.docx"
-        }
-        return Response(
-            file_stream.read(),
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers=headers
+        sectioned_text = await artifacts.get_or_create(
+            file_id, artifacts.SECTIONED, language, text_hash,
+            lambda memo: section_text(corrected_text, language, memo)
         )
-    elif format == DocumentFormat.PDF:
-        output_path = document_converter.text_to_pdf(corrected_text, output_path)
-        media_type = "application/pdf"
-        download_name = "gft_transcription.pdf"
-    elif format == DocumentFormat.HTML:
-        output_path = document_converter.text_to_html(corrected_text, output_path)
-        media_type = "text/html"
-        download_name = "gft_transcription.html"
+        output_path = await rendering.render(document_converter.text_to_branded_docx, sectioned_text, output_path)
     else:
-        output_path = txt_path
-        media_type = "text/plain"
-        download_name = "gft_transcription.txt"
-    if format != DocumentFormat.DOCX:
-        return FileResponse(
-            path=str(output_path),
-            filename=download_name,
-            media_type=media_type
+        output_path = await rendering.render(document_converter.text_to_pdf, corrected_text, output_path)
+
+    output_path = export_cache.commit(key, format, output_path)
+    return export_cache.file_response(output_path, etag, last_modified, download_name, media_type)
+
+async def export_subtitles(file_id: str, format: str, request: Request):
+    """Stream SRT/VTT cues from the stored segments, edits included"""
+    segments_path = segments.segments_path(file_id)
+    if not segments_path.exists():
+        raise HTTPException(status_code=404, detail="No timestamps stored for this transcription")
+
+    media_type, download_name = EXPORT_MEDIA_TYPES[format]
+    last_modified = segments_path.stat().st_mtime
+    segments_hash = await asyncio.to_thread(artifacts.content_hash, segments_path)
+    key = export_cache.cache_key(file_id, format, "", segments_hash)
+    etag = export_cache.make_etag(key)
+    if export_cache.is_not_modified(request, etag, last_modified):
+        return export_cache.not_modified_response(etag, last_modified)
+    cached_path = export_cache.lookup(key, format)
+    if cached_path:
+        return export_cache.file_response(cached_path, etag, last_modified, download_name, media_type)
+
+    packed = segments.load(file_id)
+    if packed is None:
+        raise HTTPException(status_code=404, detail="No timestamps stored for this transcription")
+    cues = SUBTITLE_RENDERERS[format](segments.iter_packed(packed))
+    return export_cache.stream_response(cues, key, format, etag, last_modified, download_name, media_type)
+
+async def _update_text(file_id: str, text: str) -> None:
+    """Replace the whole text; 409 if other edits kept winning the race"""
+    try:
+        await transcripts.update_text(file_id, text)
+    except transcripts.VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Transcript was modified", "current_version": e.current_version}
         )
+    artifacts.invalidate(file_id)
 
-@router.post("/edit/{file_id}")
+@router.post("/edit/{file_id}", dependencies=[Depends(auth.authorize_transcript)])
 async def edit_transcription(file_id: str, text: str = Form(...)):
-    txt_path = config.RESULTS_DIR / f"{file_id}.txt"
-    if not txt_path.exists():
+    if await transcripts.materialize(file_id) is None:
         raise HTTPException(status_code=404, detail="Transcription not found")
-    with open(txt_path, "w") as f:
-        f.write(text)
+    await _update_text(file_id, text)
     return JSONResponse(content={"success": True, "message": "Transcription updated."})
 
-@router.post("/save/{file_id}")
+@router.post("/save/{file_id}", dependencies=[Depends(auth.authorize_transcript)])
 async def save_transcription(file_id: str, request: Request):
     data = await request.json()
     text = data.get("text")
     if not text:
         raise HTTPException(status_code=400, detail="No text provided")
-    txt_path = config.RESULTS_DIR / f"{file_id}.txt"
-    with open(txt_path, "w") as f:
-        f.write(text)
+    if await transcripts.materialize(file_id) is None:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    await _update_text(file_id, text)
     return JSONResponse(content={"success": True, "message": "Transcription saved."})
+
+@router.get("/export/render/stats")
+async def render_stats():
+    """Queue depth and outcome counters of the document render pool"""
+    return rendering.get_stats()
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.db import get_pool_stats
+from app.services import metrics, openai_client
+
+router = APIRouter()
+
+# Prometheus text exposition format (charset is appended by the response)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Stage durations, bytes, errors and queue depths of this process.
+    """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+@router.get("/metrics/openai")
+async def openai_metrics():
+    """
+    Latency, retry and error counters of the shared OpenAI client.
+    """
+    return openai_client.get_metrics()
+
+@router.get("/metrics/db-pool")
+async def db_pool_stats():
+    """
+    Connection pool utilization: live, checked-out and overflow connections.
+    """
+    return get_pool_stats()
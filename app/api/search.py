@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+import logging
+from app.models import Principal, SearchResponse
+from app.services import auth, search
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/search", response_model=SearchResponse)
+async def search_transcripts(
+    q: str = Query(..., min_length=1),
+    principal: Principal = Depends(auth.require_principal),
+    limit: int = Query(20, ge=1, le=search.MAX_HITS)
+):
+    """
+    Ranked passages of the caller's transcripts matching q, with a
+    highlighted snippet and the segment timestamps when known
+    """
+    hits = await search.search(q, user_id=principal.user_id, limit=limit)
+    return SearchResponse(query=q, hits=hits)
@@ -1,17 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import JSONResponse
-from openai import OpenAI
 import app.config as config
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_db
 from app.models.user import User
-from app.db import get_db
+from app.services import openai_client
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-client = OpenAI(api_key=config.OPENAI_API_KEY)
-
 @router.get("/test-openai")
 async def test_openai():
     """
@@ -19,7 +16,7 @@ async def test_openai():
     """
     try:
         # This is a lightweight call to check API status (list models)
-        models = client.models.list()
+        models = await openai_client.list_models()
         logger.info("OpenAI API test successful.")
         return JSONResponse(content={"success": True, "message": "OpenAI API is reachable.", "model_count": len(models.data)})
     except Exception as e:
@@ -33,4 +30,4 @@ async def test_openai():
     db.add(user)
     await db.commit()
     await db.refresh(user)
-    return {"id": user.id, "username": user.username, "email": user.email}
\ No newline at end of file
+    return {"id": user.id, "username": user.username, "email": user.email}
@@ -1,195 +1,200 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from pydantic import BaseModel
-from typing import Optional
-import uuid
-import os
-from pathlib import Path
-from moviepy.editor import VideoFileClip
-from pydub import AudioSegment
-from openai import OpenAI
+from typing import Optional, Tuple
 import app.config as config
 import logging
-from app.db import get_db
+import asyncio
+from app.models import (
+    Principal,
+    TaskResponse,
+    TranscriptionRequest,
+    TranscriptionResult,
+    TranscriptPage,
+    TranscriptPatch,
+    TranscriptVersion,
+    TranscriptDocument,
+)
+from app.services import artifacts, auth, metrics
+from app.services import cache as transcription_cache
+from app.services import transcription as transcription_service
+from app.services import transcripts
+from app.services.pipeline import PipelineError
+from app.utils.file_handler import MultipartUpload, StreamedFile, stream_multipart_to_disk
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-client = OpenAI(api_key=config.OPENAI_API_KEY)
-
 class TranscriptionResponse(BaseModel):
     success: bool
     file_id: str
     transcription: Optional[str] = None
     message: str
 
-@router.post("/transcribe/", response_model=TranscriptionResponse)
+# The form is parsed from the raw body, so describe it for the OpenAPI docs
+UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {
+                "file": {"type": "string", "format": "binary"},
+                "language": {"type": "string"},
+                "prompt": {"type": "string"},
+            },
+        }}},
+    }
+}
+
+async def receive_upload(request: Request) -> Tuple[MultipartUpload, StreamedFile]:
+    """
+    Stream the uploaded file to disk while the body arrives; size and format
+    are enforced as it is read, so an oversized upload is cut off early and
+    the file is written once, never spooled or held in memory
+    """
+    with metrics.timed("upload"):
+        form = await stream_multipart_to_disk(request)
+    if not form.files:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    file = form.files[0]
+    metrics.record_bytes("upload", bytes_in=file.upload.size)
+    logger.info(f"Saved {file.filename}, {file.upload.size} bytes to: {file.upload.path} (sha256={file.upload.sha256})")
+    return form, file
+
+@router.post("/transcribe/", response_model=TranscriptionResponse, openapi_extra=UPLOAD_FORM)
 async def transcribe_video(
-    file: UploadFile = File(...),
-    language: Optional[str] = Form(None)
+    request: Request,
+    principal: Optional[Principal] = Depends(auth.optional_principal)
 ):
     """
     Upload and transcribe a video/audio file
     """
-    file_path = None
-    audio_path = None
-    compressed_path = None
-    is_video = False
-
     try:
-        logger.info(f"Received file: {file.filename}")
-
-        # Read file content
-        file_contents = await file.read()
-        file_size = len(file_contents)
-
-        # Reset file pointer
-        await file.seek(0)
-
-        # Validate file size
-        if file_size > config.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size is {config.MAX_FILE_SIZE/1024/1024}MB"
-            )
-
-        # Get file extension and validate
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in config.SUPPORTED_FORMATS:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file format. Supported formats: {', '.join(config.SUPPORTED_FORMATS)}"
-            )
-
-        # Generate unique ID and save file
-        unique_id = str(uuid.uuid4())
-        file_path = config.UPLOAD_DIR / f"{unique_id}{file_ext}"
-
-        logger.info(f"Saving file to: {file_path}")
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_contents)
-
-        # Process based on file type
-        is_video = file_ext in config.SUPPORTED_VIDEO_FORMATS
-        audio_path = file_path
-
-        # Extract audio from video if needed
-        if is_video:
-            logger.info(f"Extracting audio from video: {file_path}")
-            audio_path = config.UPLOAD_DIR / f"{unique_id}.mp3"
-            try:
-                video = VideoFileClip(str(file_path))
-                video.audio.write_audiofile(
-                    str(audio_path),
-                    logger=None
-                )
-                video.close()
-                logger.info(f"Audio extracted to: {audio_path}")
-            except Exception as e:
-                logger.error(f"Error extracting audio: {str(e)}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Error extracting audio: {str(e)}"
-                )
-
-        # Check audio file size for OpenAI API limit (25MB)
-        OPENAI_SIZE_LIMIT = 25 * 1024 * 1024
-        audio_size = os.path.getsize(audio_path)
-
-        # If file is larger than OpenAI's limit, compress it
-        if audio_size > OPENAI_SIZE_LIMIT:
-            logger.info(f"Audio file size ({audio_size/(1024*1024):.2f} MB) exceeds OpenAI limit. Compressing...")
-
-            compressed_path = config.UPLOAD_DIR / f"{unique_id}_compressed.mp3"
-
-            # Load the audio file with pydub
-            audio = AudioSegment.from_file(str(audio_path))
-
-            # Try different bitrates until file is small enough
-            for bitrate in ["64k", "48k", "32k", "24k", "16k"]:
-                logger.info(f"Trying compression with bitrate: {bitrate}")
-
-                # Export with reduced bitrate
-                audio.export(
-                    str(compressed_path),
-                    format="mp3",
-                    bitrate=bitrate
-                )
-
-                # Check if file is now small enough
-                compressed_size = os.path.getsize(compressed_path)
-                logger.info(f"Compressed size: {compressed_size/(1024*1024):.2f} MB")
-
-                if compressed_size <= OPENAI_SIZE_LIMIT:
-                    logger.info(f"Compression successful with bitrate {bitrate}")
-                    # Use the compressed file for transcription
-                    audio_path = compressed_path
-                    break
-
-            # If still too large after compression, inform the user
-            if os.path.getsize(audio_path) > OPENAI_SIZE_LIMIT:
-                raise HTTPException(
-                    status_code=413,
-                    detail="File too large for transcription even after compression. Please use a smaller file."
-                )
-
-        # Transcribe using OpenAI API
-        logger.info(f"Transcribing audio: {audio_path}")
-        try:
-            with open(audio_path, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language=language if language else None
-                )
-
-            # Access transcription text
-            transcription_text = transcription.text
-
-            # Save transcription result
-            result_path = config.RESULTS_DIR / f"{unique_id}.txt"
-            with open(result_path, "w") as f:
-                f.write(transcription_text)
-
-            logger.info(f"Transcription saved to: {result_path}")
-
-            return TranscriptionResponse(
-                success=True,
-                file_id=unique_id,
-                transcription=transcription_text,
-                message="Transcription completed successfully"
-            )
-
-        except Exception as e:
-            logger.error(f"Error during transcription: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail=f"Transcription error: {str(e)}"
-            )
+        form, file = await receive_upload(request)
+        saved = file.upload
+
+        # Run the pipeline on the worker pool and wait for it without
+        # blocking the event loop
+        result = await transcription_service.transcribe_audio(
+            saved.file_id,
+            TranscriptionRequest(file_id=saved.file_id, language=form.field("language")),
+            file_path=saved.path,
+            filename=file.filename,
+            content_hash=saved.sha256,
+            user_id=principal.user_id if principal else None,
+            wait=True
+        )
+
+        return TranscriptionResponse(
+            success=True,
+            file_id=saved.file_id,
+            transcription=result.text,
+            message="Transcription completed successfully"
+        )
 
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
 
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail=f"Unexpected error: {str(e)}"
+            detail=f"Transcription error: {str(e)}"
         )
 
-    finally:
-        # Clean up files
-        try:
-            if file_path and os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Removed uploaded file: {file_path}")
-
-            if is_video and audio_path and audio_path != file_path and os.path.exists(audio_path):
-                os.remove(audio_path)
-                logger.info(f"Removed temporary audio file: {audio_path}")
-
-            if compressed_path and compressed_path != audio_path and os.path.exists(compressed_path):
-                os.remove(compressed_path)
-                logger.info(f"Removed compressed audio file: {compressed_path}")
-
-        except Exception as e:
-            logger.error(f"Error during cleanup: {str(e)}")
\ No newline at end of file
+@router.post("/transcribe/tasks/", response_model=TaskResponse, status_code=202, openapi_extra=UPLOAD_FORM)
+async def enqueue_transcription(
+    request: Request,
+    principal: Optional[Principal] = Depends(auth.optional_principal)
+):
+    """
+    Upload a video/audio file and queue it for transcription.
+    Poll /transcribe/tasks/{task_id} for the result.
+    """
+    form, file = await receive_upload(request)
+    saved = file.upload
+
+    task = await transcription_service.transcribe_audio(
+        saved.file_id,
+        TranscriptionRequest(file_id=saved.file_id, language=form.field("language"), prompt=form.field("prompt")),
+        file_path=saved.path,
+        filename=file.filename,
+        content_hash=saved.sha256,
+        user_id=principal.user_id if principal else None
+    )
+    return TaskResponse(
+        task_id=task.task_id,
+        status=task.status,
+        message="Transcription queued"
+    )
+
+@router.get("/transcribe/tasks/{task_id}", response_model=TranscriptionResult)
+async def get_transcription_task(
+    task_id: str,
+    principal: Optional[Principal] = Depends(auth.optional_principal)
+):
+    task = await transcription_service.get_task(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # The result carries the transcript text: same rule as /transcriptions/{file_id}
+    auth.check_owner(task.user_id, principal)
+    return transcription_service.to_result(task)
+
+@router.get("/transcribe/cache/stats")
+async def transcription_cache_stats():
+    """Hit/miss counters and size of the transcription cache"""
+    return await asyncio.to_thread(transcription_cache.get_stats)
+
+@router.get("/transcriptions/", response_model=TranscriptPage)
+async def list_transcriptions(
+    principal: Principal = Depends(auth.require_principal),
+    limit: int = Query(20, ge=1, le=transcripts.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    The caller's transcripts, newest first. Pass next_cursor from the
+    previous page to get the next one.
+    """
+    try:
+        return await transcripts.list_for_user(principal.user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get(
+    "/transcriptions/{file_id}",
+    response_model=TranscriptDocument,
+    dependencies=[Depends(auth.authorize_transcript)]
+)
+async def get_transcription(file_id: str):
+    """Current text and version of a transcript, the base for PATCH edits"""
+    transcription = await transcripts.get(file_id)
+    if transcription is None:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    return TranscriptDocument(file_id=file_id, version=transcription.version, text=transcription.text or "")
+
+@router.patch(
+    "/transcriptions/{file_id}",
+    response_model=TranscriptVersion,
+    dependencies=[Depends(auth.authorize_transcript)]
+)
+async def patch_transcription(file_id: str, patch: TranscriptPatch):
+    """
+    Apply range replacements to the transcript at base_version.
+    Returns 409 with the current version if someone else edited it first.
+    """
+    try:
+        version = await transcripts.apply_edits(file_id, patch.ops, base_version=patch.base_version)
+    except transcripts.VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Transcript was modified", "current_version": e.current_version}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if version is None:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    artifacts.invalidate(file_id)
+    return version
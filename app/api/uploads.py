@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from typing import Optional
+import logging
+from app.models import Principal, TaskResponse, UploadCreate, UploadPartReceipt, UploadStatus
+from app.models.upload import UploadSession
+from app.services import auth, metrics, uploads
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+async def owned_upload(
+    upload_id: str,
+    principal: Optional[Principal] = Depends(auth.optional_principal)
+) -> UploadSession:
+    upload = await uploads.get(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    auth.check_owner(upload.user_id, principal)
+    return upload
+
+@router.post("/uploads/", response_model=UploadStatus, status_code=201)
+async def create_upload(
+    body: UploadCreate,
+    principal: Optional[Principal] = Depends(auth.optional_principal)
+):
+    """
+    Start a resumable upload. PUT the file in part_size parts to
+    /uploads/{upload_id}/parts/{number}, then POST /uploads/{upload_id}/complete.
+    """
+    upload = await uploads.create(
+        body.filename,
+        body.size,
+        user_id=principal.user_id if principal else None,
+        language=body.language,
+        prompt=body.prompt
+    )
+    return await uploads.status(upload)
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatus)
+async def get_upload(upload: UploadSession = Depends(owned_upload)):
+    """Parts received so far; resume by sending the missing ones"""
+    return await uploads.status(upload)
+
+@router.put("/uploads/{upload_id}/parts/{number}", response_model=UploadPartReceipt)
+async def upload_part(
+    number: int,
+    request: Request,
+    upload: UploadSession = Depends(owned_upload),
+    x_part_sha256: Optional[str] = Header(None)
+):
+    """
+    Store part number (1-based) from the raw request body. With an
+    X-Part-SHA256 header the part is rejected unless its hash matches.
+    """
+    with metrics.timed("upload_part"):
+        return await uploads.write_part(upload, number, request.stream(), x_part_sha256)
+
+@router.post("/uploads/{upload_id}/complete", response_model=TaskResponse, status_code=202)
+async def complete_upload(upload: UploadSession = Depends(owned_upload)):
+    """Queue the uploaded file for transcription; poll /transcribe/tasks/{task_id}"""
+    task = await uploads.complete(upload)
+    return TaskResponse(task_id=task.task_id, status=task.status, message="Transcription queued")
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload: UploadSession = Depends(owned_upload)):
+    await uploads.abort(upload)
+    return Response(status_code=204)
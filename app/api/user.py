@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Form
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.db import get_db
 from app.models.user import User
-from passlib.hash import bcrypt
+from app.services import auth, passwords
 
 router = APIRouter()
 
@@ -15,10 +16,26 @@ async def login(
 ):
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=401, detail="Correo o contraseña incorrectos")
 
-    if not user or not bcrypt.verify(password, user.password_hash):
+    valid, new_hash = await passwords.verify_password(password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Correo o contraseña incorrectos")
-    return {"message": "Login exitoso", "id": user.id, "username": user.username, "email": user.email}
+    token, expires_at = await auth.create_session(user)
+    response = {
+        "message": "Login exitoso",
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "token": token,
+        "expires_at": expires_at.isoformat()
+    }
+    if new_hash:
+        # Hashed with older parameters: upgrade it now that we have the password
+        user.password_hash = new_hash
+        await db.commit()
+    return response
 
 @router.post("/register/")
 async def register(
@@ -34,9 +51,30 @@ async def register(
     if user:
         raise HTTPException(status_code=400, detail="El usuario ya existe")
     username = f"{nombre} {apellido}"
-    password_hash = bcrypt.hash(password)
+    password_hash = await passwords.hash_password(password)
     new_user = User(username=username, email=email, password_hash=password_hash)
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
-    return {"message": "Usuario registrado", "id": new_user.id, "username": new_user.username, "email": new_user.email} 
\ No newline at end of file
+    token, expires_at = await auth.create_session(new_user)
+    return {
+        "message": "Usuario registrado",
+        "id": new_user.id,
+        "username": new_user.username,
+        "email": new_user.email,
+        "token": token,
+        "expires_at": expires_at.isoformat()
+    }
+
+@router.post("/logout/")
+async def logout(
+    principal=Depends(auth.require_principal),
+    credentials: HTTPAuthorizationCredentials = Depends(auth.bearer)
+):
+    await auth.revoke(credentials.credentials)
+    return {"message": "Sesión cerrada"}
+
+@router.get("/auth/cache/stats")
+async def auth_cache_stats():
+    """Hit/miss counters and size of the principal cache"""
+    return auth.get_stats()
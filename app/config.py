@@ -12,20 +12,102 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable not set")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # e.g. the local stub in scripts/openai_stub.py
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))  # in-flight requests per process
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 5))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 600))  # seconds, long audio uploads included
 
 # Directory settings
 UPLOAD_DIR = BASE_DIR / "static" / "uploads"
 RESULTS_DIR = BASE_DIR / "static" / "results"
+CACHE_DIR = BASE_DIR / "static" / "cache"
+TRANSCRIPTION_CACHE_DIR = CACHE_DIR / "transcriptions"
+EXPORT_CACHE_DIR = CACHE_DIR / "exports"
+
+
+def create_directories() -> None:
+    """Create the storage directories if they don't exist (at startup, not import)"""
+    for directory in (UPLOAD_DIR, RESULTS_DIR, TRANSCRIPTION_CACHE_DIR, EXPORT_CACHE_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
 
-# Create directories if they don't exist
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # File settings
 MAX_FILE_SIZE = 5000 * 1024 * 1024  # 5GB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # 1MB per read/write
+UPLOAD_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE", 16 * 1024 * 1024))  # 16MB per resumable upload part
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", 24 * 3600))  # seconds an unfinished upload is kept
 SUPPORTED_VIDEO_FORMATS = [".mp4", ".mov", ".avi", ".mkv"]
 SUPPORTED_AUDIO_FORMATS = [".mp3", ".wav", ".m4a"]
 SUPPORTED_FORMATS = SUPPORTED_VIDEO_FORMATS + SUPPORTED_AUDIO_FORMATS
+ARCHIVE_FORMATS = [".zip"]  # accepted by batch uploads and expanded into their media files
+
+# Transcription settings
+OPENAI_SIZE_LIMIT = 25 * 1024 * 1024  # Whisper API upload limit (25MB)
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", os.cpu_count() or 1))
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", 300))  # a processing task without heartbeat this long is recovered
+TASK_HEARTBEAT_INTERVAL = TASK_LEASE_SECONDS / 3
+TASK_WAIT_POLL_INTERVAL = float(os.getenv("TASK_WAIT_POLL_INTERVAL", 5))  # seconds between database checks of an awaited task
+SPEECH_SAMPLE_RATE = 16000  # Whisper resamples to 16kHz mono anyway
+SPEECH_BITRATE = os.getenv("SPEECH_BITRATE", "32k")
+MIN_AUDIO_BITRATE_KBPS = 32  # Below this, long audio is split instead of re-encoded
+MAX_AUDIO_BITRATE_KBPS = 64  # No intelligibility gain above this for mono speech
+TRANSCRIPTION_CHUNK_CONCURRENCY = int(os.getenv("TRANSCRIPTION_CHUNK_CONCURRENCY", 4))
+SEGMENT_MAX_SECONDS = float(os.getenv("SEGMENT_MAX_SECONDS", 600))  # longer audio is split and transcribed in parallel
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 100))  # files per batch, archive members included
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", 20 * 1024 * 1024 * 1024))  # 20GB saved per batch, archives expanded
+ARCHIVE_MAX_RATIO = int(os.getenv("ARCHIVE_MAX_RATIO", 20))  # media barely compresses; higher ratios are zip bombs
+BATCH_EVENTS_POLL_INTERVAL = float(os.getenv("BATCH_EVENTS_POLL_INTERVAL", 5))  # seconds; also the keep-alive period
+SILENCE_THRESHOLD_DB = int(os.getenv("SILENCE_THRESHOLD_DB", -35))
+SILENCE_MIN_DURATION = float(os.getenv("SILENCE_MIN_DURATION", 0.5))  # seconds
+
+# Audio preprocessing: silence trimming before Whisper (billed per minute)
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "false").lower() == "true"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", 30))  # analysis frame length
+VAD_MAX_SILENCE = float(os.getenv("VAD_MAX_SILENCE", 1.0))  # seconds; longer silences are shortened
+VAD_KEEP_SILENCE = float(os.getenv("VAD_KEEP_SILENCE", 0.4))  # seconds of each long silence kept as a pause
+VAD_MIN_SAVED = float(os.getenv("VAD_MIN_SAVED", 0.05))  # fraction; below it the original audio is sent
+
+# LLM post-processing settings (export)
+LLM_CHUNK_SIZE = int(os.getenv("LLM_CHUNK_SIZE", 2000))  # characters per grammar-correction call
+LLM_SECTION_CHUNK_SIZE = int(os.getenv("LLM_SECTION_CHUNK_SIZE", 4000))  # characters per sectioning call; its reply must fit in max_tokens
+LLM_CHUNK_CONCURRENCY = int(os.getenv("LLM_CHUNK_CONCURRENCY", 4))  # parallel calls per export
+
+# Document rendering settings (export)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 1))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", 120))  # seconds per document
+EXPORT_STREAM_CHUNK_SIZE = int(os.getenv("EXPORT_STREAM_CHUNK_SIZE", 64 * 1024))  # bytes per streamed write
+
+# Transcription cache settings
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+TRANSCRIPTION_CACHE_MAX_AGE = int(os.getenv("TRANSCRIPTION_CACHE_MAX_AGE", 30 * 24 * 3600))  # seconds
+TRANSCRIPTION_CACHE_SCAN_INTERVAL = int(os.getenv("TRANSCRIPTION_CACHE_SCAN_INTERVAL", 300))  # seconds between eviction scans while under budget
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Transcript editing settings
+TRANSCRIPT_MAX_REVISIONS = int(os.getenv("TRANSCRIPT_MAX_REVISIONS", 500))  # edit history kept per transcript
+
+# Password hashing settings
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", 12))  # log2 cost; raising it rehashes on login
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+# Database settings
+DATABASE_URL = os.getenv("DATABASE_URL")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"  # logs every statement; debugging only
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))  # persistent connections per process
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))  # extra connections opened under bursts
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds; below the server/proxy idle timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))  # asyncpg prepared statements per connection; 0 behind pgbouncer
+
+# Session settings
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", 7 * 24 * 3600))  # seconds a login token stays valid
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 60))  # seconds a resolved token is trusted without the DB
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+
+# FFmpeg binaries (must be on PATH unless overridden)
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
 
 # App settings
 APP_NAME = "GFT Video Converter"
\ No newline at end of file
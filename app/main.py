@@ -1,11 +1,12 @@
 import logging
-from fastapi import FastAPI, Request, Depends
+from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 import app.config as config
-from app.api import export, transcribe, test, user
+from app.api import batches, export, metrics as metrics_api, search as search_api, transcribe, test, uploads, user
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.db import SessionLocal, init_db
+from app.db import engine, init_db
+from app.services import openai_client, passwords, rendering, search
+from app.services import transcription as transcription_service
 
 logger = logging.getLogger(__name__)
 
@@ -32,17 +33,28 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "An unexpected error occurred. Please try again."}
     )
 
-# Dependency to get the database session
-async def get_db():
-    async with SessionLocal() as session:
-        yield session
-
 # Include routers
 app.include_router(export.router)
 app.include_router(transcribe.router)
 app.include_router(test.router)
 app.include_router(user.router)
+app.include_router(search_api.router)
+app.include_router(metrics_api.router)
+app.include_router(uploads.router)
+app.include_router(batches.router)
 
 @app.on_event("startup")
 async def on_startup():
-    await init_db()
\ No newline at end of file
+    config.create_directories()
+    await init_db()
+    await search.init()
+    await transcription_service.start_workers()
+    rendering.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await transcription_service.stop_workers()
+    rendering.stop()
+    passwords.shutdown()
+    await openai_client.close_client()
+    await engine.dispose()
\ No newline at end of file
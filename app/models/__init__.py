@@ -0,0 +1,24 @@
+# app/models.py was shadowed by this package; the Pydantic schemas live in
+# schemas.py and are re-exported here so `from app.models import ...` works.
+from app.models.schemas import (
+    TaskStatus,
+    TranscriptionModel,
+    TaskResponse,
+    TranscriptionRequest,
+    TranscriptionResult,
+    BatchFile,
+    BatchStatus,
+    TranscriptSegment,
+    TranscriptSummary,
+    TranscriptPage,
+    SearchHit,
+    SearchResponse,
+    TextEdit,
+    TranscriptPatch,
+    TranscriptVersion,
+    TranscriptDocument,
+    UploadCreate,
+    UploadStatus,
+    UploadPartReceipt,
+    Principal,
+)
@@ -0,0 +1,125 @@
+from pydantic import BaseModel
+from enum import Enum
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class TaskStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class TranscriptionModel(str, Enum):
+    WHISPER_1 = "whisper-1"
+
+class TaskResponse(BaseModel):
+    task_id: str
+    status: TaskStatus
+    message: str
+
+class TranscriptionRequest(BaseModel):
+    file_id: str
+    language: Optional[str] = None
+    prompt: Optional[str] = None
+    response_format: Optional[str] = "json"
+    temperature: Optional[float] = 0
+    
+class TranscriptionResult(BaseModel):
+    task_id: str
+    status: TaskStatus
+    file_id: Optional[str] = None
+    text: Optional[str] = None
+    file_path: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchFile(BaseModel):
+    task_id: str
+    file_id: Optional[str] = None
+    filename: Optional[str] = None
+    status: TaskStatus
+    error: Optional[str] = None
+
+class BatchStatus(BaseModel):
+    batch_id: str
+    total: int
+    counts: Dict[str, int]  # tasks per TaskStatus value
+    done: bool
+    files: List[BatchFile]
+
+class TranscriptSegment(BaseModel):
+    start: float
+    end: float
+    text: str
+
+class TranscriptSummary(BaseModel):
+    file_id: str
+    filename: Optional[str] = None
+    language: Optional[str] = None
+    created_at: datetime
+
+class TranscriptPage(BaseModel):
+    items: List[TranscriptSummary]
+    next_cursor: Optional[str] = None
+
+class SearchHit(BaseModel):
+    file_id: str
+    filename: Optional[str] = None
+    start: Optional[float] = None
+    end: Optional[float] = None
+    snippet: str
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    hits: List[SearchHit]
+
+class TextEdit(BaseModel):
+    """Replace text[start:end] with text; offsets are in Unicode code points"""
+    start: int
+    end: int
+    text: str = ""
+
+class TranscriptPatch(BaseModel):
+    base_version: int
+    ops: List[TextEdit]
+
+class TranscriptVersion(BaseModel):
+    file_id: str
+    version: int
+    length: int
+
+class TranscriptDocument(BaseModel):
+    file_id: str
+    version: int
+    text: str
+
+class UploadCreate(BaseModel):
+    filename: str
+    size: int  # bytes
+    language: Optional[str] = None
+    prompt: Optional[str] = None
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    status: str
+    filename: str
+    size: int
+    part_size: int
+    part_count: int
+    received_parts: List[int]
+    received_bytes: int
+    expires_at: datetime
+    task_id: Optional[str] = None
+
+class UploadPartReceipt(BaseModel):
+    upload_id: str
+    number: int
+    size: int
+    sha256: str
+
+class Principal(BaseModel):
+    """The authenticated caller, resolved from a session token"""
+    user_id: int
+    username: Optional[str] = None
+    email: Optional[str] = None
+    expires_at: datetime
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, Float, String, Text, Index, func, literal_column
+from app.models.user import Base  # Import Base from user.py
+
+# Text search configuration: transcripts are multilingual, so no stemming
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+
+class TranscriptChunk(Base):
+    """A searchable piece of a transcript: one Whisper segment or paragraph"""
+    __tablename__ = "transcript_chunks"
+    id = Column(Integer, primary_key=True)
+    file_id = Column(String, index=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    char_start = Column(Integer, nullable=True)  # span in the transcript text, when known
+    char_end = Column(Integer, nullable=True)
+    start = Column(Float, nullable=True)  # seconds, when timestamps are known
+    end = Column(Float, nullable=True)
+    text = Column(Text)
+
+    __table_args__ = (
+        # Postgres full-text index; SQLite uses the FTS5 table from
+        # app.services.search instead
+        Index(
+            "ix_transcript_chunks_tsv",
+            func.to_tsvector(TS_CONFIG, text),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from app.models.user import Base  # Import Base from user.py
+
+
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+    token_hash = Column(String, primary_key=True)  # sha256 of the bearer token, never the token itself
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.models.user import Base  # Import Base from user.py
+from app.models.schemas import TaskStatus
+
+
+class TranscriptionTask(Base):
+    __tablename__ = "transcription_tasks"
+    id = Column(String, primary_key=True, index=True)  # task_id
+    status = Column(String, index=True, default=TaskStatus.PENDING.value)
+    file_id = Column(String, index=True)
+    user_id = Column(Integer, nullable=True)  # owner of the resulting transcript
+    batch_id = Column(String, nullable=True, index=True)
+    filename = Column(String)
+    source_path = Column(String)  # upload waiting in UPLOAD_DIR
+    content_hash = Column(String, nullable=True)  # sha256 of the upload
+    language = Column(String, nullable=True)
+    prompt = Column(Text, nullable=True)
+    text = Column(Text, nullable=True)
+    file_path = Column(String, nullable=True)  # result in RESULTS_DIR
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TranscriptionBatch(Base):
+    __tablename__ = "transcription_batches"
+    id = Column(String, primary_key=True)  # batch_id
+    user_id = Column(Integer, nullable=True)
+    file_count = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
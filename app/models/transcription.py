@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.user import Base  # Import Base from user.py
@@ -7,11 +7,36 @@ from app.models.user import Base  # Import Base from user.py
 class Transcription(Base):
     __tablename__ = "transcriptions"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    file_id = Column(String, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    file_id = Column(String, unique=True, index=True)
     filename = Column(String)
+    language = Column(String, nullable=True)
+    text = Column(Text)
+    segments = Column(JSON, nullable=True)  # packed, see app.services.segments
+    version = Column(Integer, default=1, nullable=False)  # bumped by every edit
     created_at = Column(DateTime, default=datetime.utcnow)
-    # Optionally, store the transcription text or path
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User")
 
+    __table_args__ = (
+        # History listing: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_transcriptions_user_created", "user_id", "created_at", "id"),
+    )
+
+
+class TranscriptRevision(Base):
+    """
+    One edit of a transcript: the operations that turned version - 1 into
+    version, each with the text it replaced so it can be undone
+    """
+    __tablename__ = "transcript_revisions"
+    id = Column(Integer, primary_key=True)
+    file_id = Column(String, index=True)
+    version = Column(Integer)
+    ops = Column(JSON)  # [[start, end, text, replaced_text], ...] against version - 1
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("file_id", "version", name="uq_transcript_revisions_version"),
+    )
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+from app.models.user import Base  # Import Base from user.py
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    id = Column(String, primary_key=True)  # upload_id, also the file_id of the upload
+    user_id = Column(Integer, nullable=True)  # owner of the resulting transcript
+    status = Column(String, default="open")  # open, completed
+    filename = Column(String)
+    path = Column(String)  # preallocated file in UPLOAD_DIR
+    size = Column(BigInteger)
+    part_size = Column(Integer)
+    language = Column(String, nullable=True)
+    prompt = Column(Text, nullable=True)
+    task_id = Column(String, nullable=True)  # set on completion
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+
+
+class UploadPart(Base):
+    __tablename__ = "upload_parts"
+    __table_args__ = (UniqueConstraint("upload_id", "number"),)
+    id = Column(Integer, primary_key=True)
+    upload_id = Column(String, ForeignKey("upload_sessions.id"), index=True)
+    number = Column(Integer)  # 1-based; covers bytes [(number - 1) * part_size, number * part_size)
+    size = Column(Integer)
+    sha256 = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
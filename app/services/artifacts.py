@@ -0,0 +1,162 @@
+"""
+Derived text artifacts of a transcript (LLM-corrected, sectioned).
+
+Each artifact is stored as RESULTS_DIR/derived/{file_id}/{kind}.{language}.json
+together with the hash of the transcript text it was computed from, so an
+export in another format reuses it instead of calling the LLM again. A
+stored artifact only counts when its hash matches the current text, and
+edits drop a transcript's artifacts explicitly.
+
+The per-chunk LLM results behind an artifact are kept as well
+({kind}.{language}.chunks.json, keyed by chunk hash) and survive edits,
+so after an edit only the chunks whose text changed go back to the LLM.
+"""
+import re
+import json
+import asyncio
+import hashlib
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+import app.config as config
+from app.utils.file_handler import is_valid_id
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = config.RESULTS_DIR / "derived"
+
+CORRECTED = "corrected"
+SECTIONED = "sectioned"
+
+# Language codes such as "es", "en" or "pt-BR"; part of the artifact file names
+LANGUAGE_PATTERN = r"^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})?$"
+
+# One lock per artifact so concurrent exports of a file share one LLM pass,
+# with the number of exports holding or awaiting it; dropped at zero
+_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+
+@lru_cache(maxsize=4096)
+def _hash_file(path: Path, mtime_ns: int, size: int) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def content_hash(path: Path) -> str:
+    """
+    sha256 of a transcript file, recomputed only when it changes on disk.
+    Reads the file, so call it with asyncio.to_thread from the event loop.
+    """
+    stat = path.stat()
+    return _hash_file(path, stat.st_mtime_ns, stat.st_size)
+
+
+def _derived_dir(file_id: str) -> Path:
+    if not is_valid_id(file_id):
+        raise ValueError(f"Invalid file_id: {file_id!r}")
+    return DERIVED_DIR / file_id
+
+
+def _artifact_name(kind: str, language: str, suffix: str) -> str:
+    if not re.match(LANGUAGE_PATTERN, language):
+        raise ValueError(f"Invalid language: {language!r}")
+    return f"{kind}.{language}{suffix}"
+
+
+def _artifact_path(file_id: str, kind: str, language: str) -> Path:
+    return _derived_dir(file_id) / _artifact_name(kind, language, ".json")
+
+
+def _chunks_path(file_id: str, kind: str, language: str) -> Path:
+    return _derived_dir(file_id) / _artifact_name(kind, language, ".chunks.json")
+
+
+def chunk_key(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def get_chunk_results(file_id: str, kind: str, language: str) -> Dict[str, str]:
+    """LLM results of previously processed chunks, by chunk_key()"""
+    try:
+        with open(_chunks_path(file_id, kind, language), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def put_chunk_results(file_id: str, kind: str, language: str, results: Dict[str, str]) -> None:
+    path = _chunks_path(file_id, kind, language)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+def get(file_id: str, kind: str, language: str, text_hash: str) -> Optional[str]:
+    """Return the stored artifact if it was derived from text with text_hash"""
+    try:
+        with open(_artifact_path(file_id, kind, language), "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if artifact.get("content_hash") != text_hash:
+        return None
+    return artifact["text"]
+
+
+def put(file_id: str, kind: str, language: str, text_hash: str, text: str) -> None:
+    path = _artifact_path(file_id, kind, language)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"content_hash": text_hash, "text": text}, f, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+@asynccontextmanager
+async def _artifact_lock(key: str) -> AsyncIterator[None]:
+    lock, users = _locks.get(key, (None, 0))
+    lock = lock or asyncio.Lock()
+    _locks[key] = (lock, users + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        lock, users = _locks[key]
+        if users == 1:
+            del _locks[key]
+        else:
+            _locks[key] = (lock, users - 1)
+
+
+async def get_or_create(
+    file_id: str,
+    kind: str,
+    language: str,
+    text_hash: str,
+    create: Callable[[Dict[str, str]], Awaitable[str]]
+) -> str:
+    """
+    Return the stored artifact, computing and storing it on a miss.
+    create receives the stored per-chunk results and updates them in place.
+    """
+    async with _artifact_lock(f"{file_id}/{kind}.{language}"):
+        text = get(file_id, kind, language, text_hash)
+        if text is not None:
+            logger.info(f"Reusing {kind} text for {file_id} ({language})")
+            return text
+        chunk_results = get_chunk_results(file_id, kind, language)
+        text = await create(chunk_results)
+        put_chunk_results(file_id, kind, language, chunk_results)
+        put(file_id, kind, language, text_hash, text)
+        return text
+
+
+def invalidate(file_id: str) -> None:
+    """Drop the artifacts derived from a transcript, keeping per-chunk results"""
+    for path in _derived_dir(file_id).glob("*.json"):
+        if not path.name.endswith(".chunks.json"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,122 @@
+"""
+Session tokens and principal resolution.
+
+/login/ issues an opaque bearer token; only its sha256 is stored, in
+user_sessions. Resolving a token to a Principal hits the database once,
+then is served from an in-process TTL/LRU cache for AUTH_CACHE_TTL
+seconds, so per-request authentication costs a dict lookup. Logout evicts
+locally; other worker processes converge within AUTH_CACHE_TTL.
+
+Routes use the require_principal / optional_principal dependencies.
+Transcripts without an owner (uploaded anonymously) stay accessible to
+everyone; owned ones only to their owner, see check_owner().
+"""
+import hashlib
+import secrets
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import delete
+from sqlalchemy.future import select
+import app.config as config
+from app.db import SessionLocal
+from app.models import Principal
+from app.models.session import UserSession
+from app.models.user import User
+from app.services import transcripts
+from app.utils.file_handler import is_valid_id
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+bearer = HTTPBearer(auto_error=False)
+
+# token hash -> Principal
+_principals: TTLCache[Principal] = TTLCache(config.AUTH_CACHE_SIZE, config.AUTH_CACHE_TTL)
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def create_session(user: User) -> Tuple[str, datetime]:
+    """Issue a token for user; returns (token, expires_at)"""
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.utcnow() + timedelta(seconds=config.AUTH_TOKEN_TTL)
+    async with SessionLocal() as db:
+        db.add(UserSession(token_hash=_token_hash(token), user_id=user.id, expires_at=expires_at))
+        # Opportunistic cleanup, served by the expires_at index
+        await db.execute(delete(UserSession).where(UserSession.expires_at < datetime.utcnow()))
+        await db.commit()
+    return token, expires_at
+
+
+async def resolve(token: str) -> Optional[Principal]:
+    """The principal behind token, or None if it is unknown or expired"""
+    key = _token_hash(token)
+    principal = _principals.get(key)
+    if principal is None:
+        async with SessionLocal() as db:
+            row = (await db.execute(
+                select(UserSession.expires_at, User.id, User.username, User.email)
+                .join(User, User.id == UserSession.user_id)
+                .where(UserSession.token_hash == key)
+            )).first()
+        if row is None:
+            return None
+        principal = Principal(user_id=row.id, username=row.username, email=row.email, expires_at=row.expires_at)
+        _principals.put(key, principal)
+    if principal.expires_at <= datetime.utcnow():
+        _principals.pop(key)
+        return None
+    return principal
+
+
+async def revoke(token: str) -> None:
+    key = _token_hash(token)
+    _principals.pop(key)
+    async with SessionLocal() as db:
+        await db.execute(delete(UserSession).where(UserSession.token_hash == key))
+        await db.commit()
+
+
+async def optional_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)
+) -> Optional[Principal]:
+    """The caller if a valid bearer token was sent; 401 for an invalid one"""
+    if credentials is None:
+        return None
+    principal = await resolve(credentials.credentials)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return principal
+
+
+async def require_principal(principal: Optional[Principal] = Depends(optional_principal)) -> Principal:
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return principal
+
+
+def check_owner(owner_id: Optional[int], principal: Optional[Principal]) -> None:
+    """403 unless the transcript is unowned or belongs to principal"""
+    if owner_id is not None and (principal is None or principal.user_id != owner_id):
+        raise HTTPException(status_code=403, detail="Not allowed to access this transcription")
+
+
+async def authorize_transcript(
+    file_id: str,
+    principal: Optional[Principal] = Depends(optional_principal)
+) -> Optional[Principal]:
+    """Dependency for /{file_id} routes: the caller, once allowed to access file_id"""
+    # file_id ends up in file paths: anything but a uuid is not a transcript
+    if not is_valid_id(file_id):
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    check_owner(await transcripts.owner_of(file_id), principal)
+    return principal
+
+
+def get_stats() -> dict:
+    return _principals.stats()
@@ -0,0 +1,190 @@
+"""
+Batch transcription: many files, or ZIP archives of them, in one request.
+
+Every file becomes an ordinary transcription task, with its own file_id
+and transcript, tagged with the batch_id. The task queue serves one task
+per batch in turn with the other queued uploads (see FairQueue), so a
+large batch shares the workers instead of holding them until it is done.
+
+Progress is read from the tasks themselves: status() aggregates them, and
+events() streams one Server-Sent Event per finished file. The stream wakes
+as soon as a worker of this process finishes a task of the batch and polls
+the database every BATCH_EVENTS_POLL_INTERVAL otherwise, which also covers
+tasks run by other processes.
+"""
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from sqlalchemy.future import select
+from starlette.concurrency import run_in_threadpool
+import app.config as config
+from app.db import SessionLocal
+from app.models import BatchFile, BatchStatus, TaskStatus, TranscriptionRequest
+from app.models.task import TranscriptionBatch, TranscriptionTask
+from app.services import metrics
+from app.services import transcription as transcription_service
+from app.utils.file_handler import (
+    MultipartUpload,
+    SavedUpload,
+    StreamedFile,
+    extract_archive,
+    remove_saved,
+    stream_multipart_to_disk,
+)
+
+logger = logging.getLogger(__name__)
+
+FINISHED = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+
+async def receive(request: Request) -> MultipartUpload:
+    """
+    Stream the batch's files to disk while the body arrives, archives still
+    packed; BATCH_MAX_BYTES and BATCH_MAX_FILES cut it off early
+    """
+    with metrics.timed("upload"):
+        form = await stream_multipart_to_disk(
+            request,
+            formats=config.SUPPORTED_FORMATS + config.ARCHIVE_FORMATS,
+            max_total=config.BATCH_MAX_BYTES,
+            max_files=config.BATCH_MAX_FILES
+        )
+    metrics.record_bytes("upload", bytes_in=sum(file.upload.size for file in form.files))
+    return form
+
+
+async def _expand(files: List[StreamedFile]) -> List[Tuple[str, SavedUpload]]:
+    """
+    The batch's media files in order, archives replaced by their members;
+    all or nothing. BATCH_MAX_BYTES also caps the expanded members.
+    """
+    saved: List[Tuple[str, SavedUpload]] = []
+    try:
+        for file in files:
+            if file.upload.extension in config.ARCHIVE_FORMATS:
+                remaining = config.BATCH_MAX_BYTES - sum(upload.size for _, upload in saved)
+                members = await run_in_threadpool(
+                    extract_archive, file.upload.path, config.BATCH_MAX_FILES - len(saved), remaining
+                )
+                logger.info(f"Extracted {len(members)} files from {file.filename}")
+                saved.extend(members)
+            else:
+                if len(saved) == config.BATCH_MAX_FILES:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Too many files. Maximum is {config.BATCH_MAX_FILES} per batch"
+                    )
+                saved.append((file.filename, file.upload))
+    except BaseException:
+        remove_saved([upload for _, upload in saved] + [file.upload for file in files])
+        raise
+    finally:
+        remove_saved(file.upload for file in files if file.upload.extension in config.ARCHIVE_FORMATS)
+    return saved
+
+
+async def create(
+    files: List[StreamedFile],
+    user_id: Optional[int] = None,
+    language: Optional[str] = None,
+    prompt: Optional[str] = None
+) -> BatchStatus:
+    """Expand archives and queue one transcription task per media file"""
+    saved = await _expand(files)
+    if not saved:
+        raise HTTPException(status_code=400, detail="The batch contains no supported media files")
+
+    batch_id = str(uuid.uuid4())
+    tasks = [
+        transcription_service.new_task(
+            upload.file_id,
+            TranscriptionRequest(file_id=upload.file_id, language=language, prompt=prompt),
+            file_path=upload.path,
+            filename=filename,
+            content_hash=upload.sha256,
+            user_id=user_id,
+            batch_id=batch_id
+        )
+        for filename, upload in saved
+    ]
+    task_ids = [task.id for task in tasks]
+    try:
+        # The batch and all its tasks, or nothing
+        async with SessionLocal() as db:
+            db.add(TranscriptionBatch(id=batch_id, user_id=user_id, file_count=len(saved)))
+            db.add_all(tasks)
+            await db.commit()
+    except BaseException:
+        remove_saved(upload for _, upload in saved)
+        raise
+
+    for task_id in task_ids:
+        transcription_service.enqueue(task_id, batch_id)
+    logger.info(f"Queued batch {batch_id} with {len(saved)} files")
+    return await status(batch_id)
+
+
+async def get(batch_id: str) -> Optional[TranscriptionBatch]:
+    async with SessionLocal() as db:
+        return await db.get(TranscriptionBatch, batch_id)
+
+
+async def status(batch_id: str) -> BatchStatus:
+    """Per-file status and counts by status, from the batch's tasks"""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(
+                TranscriptionTask.id,
+                TranscriptionTask.file_id,
+                TranscriptionTask.filename,
+                TranscriptionTask.status,
+                TranscriptionTask.error
+            )
+            .where(TranscriptionTask.batch_id == batch_id)
+            .order_by(TranscriptionTask.created_at)
+        )
+        rows = result.all()
+
+    files = [
+        BatchFile(task_id=row.id, file_id=row.file_id, filename=row.filename, status=row.status, error=row.error)
+        for row in rows
+    ]
+    counts = {task_status.value: 0 for task_status in TaskStatus}
+    for file in files:
+        counts[file.status.value] += 1
+    return BatchStatus(
+        batch_id=batch_id,
+        total=len(files),
+        counts=counts,
+        done=all(file.status in FINISHED for file in files),
+        files=files
+    )
+
+
+async def events(batch_id: str) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for a batch: a "file" event with its BatchFile as
+    each file finishes, then a "done" event with the final counts. Files
+    already finished when the stream opens are sent first.
+    """
+    reported = set()
+    with transcription_service.watch_batch(batch_id) as finished:
+        while True:
+            # Cleared before reading, so a task finishing meanwhile wakes the next wait
+            finished.clear()
+            current = await status(batch_id)
+            for file in current.files:
+                if file.status in FINISHED and file.task_id not in reported:
+                    reported.add(file.task_id)
+                    yield f"event: file\ndata: {file.model_dump_json()}\n\n"
+            if current.done:
+                yield f"event: done\ndata: {current.model_dump_json(exclude={'files'})}\n\n"
+                return
+            try:
+                await asyncio.wait_for(finished.wait(), config.BATCH_EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
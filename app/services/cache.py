@@ -0,0 +1,166 @@
+"""
+Content-addressed cache of Whisper results.
+
+Entries are JSON files under CACHE_DIR/transcriptions named after a hash of
+the audio content plus the parameters that change the output (model,
+language, prompt). Reads refresh the file's mtime, so eviction drops the
+least recently used entries once the directory grows past
+TRANSCRIPTION_CACHE_MAX_BYTES, and entries older than
+TRANSCRIPTION_CACHE_MAX_AGE are treated as misses and removed. The
+directory is only scanned when the size tracked by this process crosses
+the budget or every TRANSCRIPTION_CACHE_SCAN_INTERVAL, which also picks
+up what other processes wrote.
+
+get(), put() and evict() do blocking file I/O: call them through
+asyncio.to_thread from the event loop.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+import app.config as config
+from app.models import TranscriptionModel
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = config.TRANSCRIPTION_CACHE_DIR
+
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+# Over budget, eviction frees down to this share of it, so the next scan
+# is not due on the very next put
+EVICT_TARGET = 0.9
+
+# Guards stats and the size tracking below: get() and put() run in threads
+_lock = threading.Lock()
+# Bytes in CACHE_DIR at the last scan plus those put since
+_tracked_bytes = 0
+_last_scan: Optional[float] = None
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _lock:
+        stats[name] += n
+
+
+def file_sha256(path: Path, chunk_size: int = config.UPLOAD_CHUNK_SIZE) -> str:
+    """Hash a file without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(
+    content_hash: str,
+    language: Optional[str],
+    prompt: Optional[str],
+    model: TranscriptionModel = TranscriptionModel.WHISPER_1
+) -> str:
+    params = json.dumps([content_hash, model.value, language or "", prompt or ""])
+    return hashlib.sha256(params.encode()).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return CACHE_DIR / f"{key}.json"
+
+
+def get(key: str) -> Optional[dict]:
+    """Return the cached payload for key, or None"""
+    path = _entry_path(key)
+    try:
+        if time.time() - path.stat().st_mtime > config.TRANSCRIPTION_CACHE_MAX_AGE:
+            path.unlink(missing_ok=True)
+            _count("evictions")
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        os.utime(path)  # mark as recently used
+        return payload
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def put(key: str, payload: dict) -> None:
+    """Store payload under key, then evict if the cache may be over budget"""
+    global _tracked_bytes, _last_scan
+    path = _entry_path(key)
+    # Unique per writer: puts of the same key may run in parallel threads
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    size = tmp_path.stat().st_size
+    os.replace(tmp_path, path)
+
+    now = time.monotonic()
+    with _lock:
+        _tracked_bytes += size
+        scan = (
+            _last_scan is None
+            or _tracked_bytes > config.TRANSCRIPTION_CACHE_MAX_BYTES
+            or now - _last_scan > config.TRANSCRIPTION_CACHE_SCAN_INTERVAL
+        )
+        if scan:
+            # Claimed here so parallel puts do not scan as well
+            _last_scan = now
+    if scan:
+        evict()
+
+
+def evict() -> None:
+    """Drop expired entries, then least recently used ones until under budget"""
+    global _tracked_bytes
+    now = time.time()
+    entries = []
+    total = 0
+    evicted = 0
+    for path in CACHE_DIR.glob("*.json"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if now - stat.st_mtime > config.TRANSCRIPTION_CACHE_MAX_AGE:
+            path.unlink(missing_ok=True)
+            evicted += 1
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    entries.sort()
+    budget = config.TRANSCRIPTION_CACHE_MAX_BYTES
+    target = budget if total <= budget else budget * EVICT_TARGET
+    for _, size, path in entries:
+        if total <= target:
+            break
+        path.unlink(missing_ok=True)
+        evicted += 1
+        total -= size
+
+    with _lock:
+        stats["evictions"] += evicted
+        _tracked_bytes = total
+
+
+def record_hit() -> None:
+    _count("hits")
+
+
+def record_miss() -> None:
+    _count("misses")
+
+
+def get_stats() -> dict:
+    sizes = [path.stat().st_size for path in CACHE_DIR.glob("*.json")]
+    with _lock:
+        counters = dict(stats)
+    return {
+        **counters,
+        "entries": len(sizes),
+        "bytes": sum(sizes)
+    }
@@ -0,0 +1,178 @@
+"""
+Cache of rendered export documents and HTTP validators.
+
+Rendered DOCX/PDF/HTML files live in CACHE_DIR/exports, named after a hash
+of (file_id, format, language, transcript content hash). The same hash is
+the document's strong ETag, so a conditional GET is answered with 304
+before the transcript is even read. Hits refresh the file's mtime and the
+least recently used files are evicted past EXPORT_CACHE_MAX_BYTES.
+Formats that render incrementally are streamed to the client while they
+are written to the cache, see stream_response().
+"""
+import os
+import time
+import uuid
+import hashlib
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = config.EXPORT_CACHE_DIR
+
+# Bump when the document layout changes so stale renders are not served
+RENDER_VERSION = "2"
+
+# Partial renders left behind by a failed export are removed after this
+STALE_PENDING_SECONDS = 3600
+
+
+def cache_key(file_id: str, format: str, language: str, content_hash: str) -> str:
+    raw = f"{RENDER_VERSION}:{file_id}:{format}:{language}:{content_hash}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def make_etag(key: str) -> str:
+    return f'"{key}"'
+
+
+def _entry_path(key: str, format: str) -> Path:
+    return EXPORT_DIR / f"{key}.{format}"
+
+
+def lookup(key: str, format: str) -> Optional[Path]:
+    """Return the cached render for key, marking it as recently used"""
+    path = _entry_path(key, format)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def pending_path(key: str, format: str) -> Path:
+    """Where a renderer should write before commit() publishes the file"""
+    return EXPORT_DIR / f"{key}.{uuid.uuid4().hex}.tmp.{format}"
+
+
+def commit(key: str, format: str, rendered_path: Path) -> Path:
+    path = _entry_path(key, format)
+    os.replace(rendered_path, path)
+    evict()
+    return path
+
+
+def evict() -> None:
+    """Remove least recently used renders until under EXPORT_CACHE_MAX_BYTES"""
+    now = time.time()
+    entries = []
+    total = 0
+    for path in EXPORT_DIR.iterdir():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if ".tmp." in path.name:
+            if now - stat.st_mtime > STALE_PENDING_SECONDS:
+                path.unlink(missing_ok=True)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= config.EXPORT_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when it is absent"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: float) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        # Always revalidate: the transcript may be edited at any time
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def not_modified_response(etag: str, last_modified: float) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def file_response(path: Path, etag: str, last_modified: float, filename: str, media_type: str) -> FileResponse:
+    return FileResponse(
+        path=str(path),
+        filename=filename,
+        media_type=media_type,
+        headers=validator_headers(etag, last_modified)
+    )
+
+
+def _tee(chunks: Iterable[str], key: str, format: str) -> Iterator[bytes]:
+    """
+    Yield the rendered document in EXPORT_STREAM_CHUNK_SIZE blocks while
+    writing it to a pending file, committed once the render completes
+    """
+    path = pending_path(key, format)
+    buffer = []
+    buffered = 0
+    try:
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                buffer.append(data)
+                buffered += len(data)
+                if buffered >= config.EXPORT_STREAM_CHUNK_SIZE:
+                    block = b"".join(buffer)
+                    buffer, buffered = [], 0
+                    f.write(block)
+                    yield block
+            block = b"".join(buffer)
+            f.write(block)
+        commit(key, format, path)
+        if block:
+            yield block
+    except BaseException:
+        # Includes GeneratorExit when the client disconnects mid-stream
+        path.unlink(missing_ok=True)
+        raise
+
+
+def stream_response(
+    chunks: Iterable[str],
+    key: str,
+    format: str,
+    etag: str,
+    last_modified: float,
+    filename: str,
+    media_type: str
+) -> StreamingResponse:
+    """Stream a document as it renders and cache it under key"""
+    headers = validator_headers(etag, last_modified)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(_tee(chunks, key, format), media_type=media_type, headers=headers)
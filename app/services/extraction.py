@@ -0,0 +1,114 @@
+"""
+Audio extraction and compression with ffmpeg.
+
+The audio track is stream-copied when Whisper already accepts its codec,
+otherwise it is transcoded straight to mono 16kHz speech settings.
+Oversized audio is re-encoded once, at the bitrate that fits the upload
+limit. ffmpeg runs as an asyncio subprocess, so neither stage blocks the
+event loop or holds decoded audio in Python memory.
+"""
+import os
+import logging
+from pathlib import Path
+from typing import Optional
+import app.config as config
+from app.services.pipeline import PipelineError
+from app.utils import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+# Codecs Whisper accepts as-is, with the container to copy them into
+STREAM_COPY_CONTAINERS = {
+    "mp3": ".mp3",
+    "aac": ".m4a",
+    "opus": ".webm",
+    "vorbis": ".ogg",
+}
+
+# Leave room for container overhead and VBR drift when sizing the output
+SIZE_SAFETY_MARGIN = 0.95
+
+
+def transcode_args(output_path: Path, bitrate: str = config.SPEECH_BITRATE) -> list:
+    """ffmpeg output options for mono 16kHz MP3 speech audio"""
+    return [
+        "-vn",
+        "-ac", "1",
+        "-ar", str(config.SPEECH_SAMPLE_RATE),
+        "-c:a", "libmp3lame",
+        "-b:a", bitrate,
+        str(output_path)
+    ]
+
+
+async def extract_audio(video_path: Path, output_stem: Path) -> Path:
+    """
+    Write the first audio track of video_path next to output_stem and
+    return its path; the extension depends on whether it was copied
+    """
+    try:
+        info = await ffmpeg.probe(video_path)
+        audio_streams = [s for s in info.get("streams", []) if s.get("codec_type") == "audio"]
+        if not audio_streams:
+            raise PipelineError(400, "The video has no audio track")
+        codec = audio_streams[0].get("codec_name")
+
+        if codec in STREAM_COPY_CONTAINERS:
+            audio_path = output_stem.with_suffix(STREAM_COPY_CONTAINERS[codec])
+            logger.info(f"Copying {codec} audio track from {video_path}")
+            await ffmpeg.ffmpeg(
+                "-i", str(video_path),
+                "-map", "0:a:0",
+                "-vn", "-c:a", "copy",
+                str(audio_path)
+            )
+        else:
+            audio_path = output_stem.with_suffix(".mp3")
+            logger.info(f"Transcoding {codec} audio track from {video_path}")
+            await ffmpeg.ffmpeg(
+                "-i", str(video_path),
+                "-map", "0:a:0",
+                *transcode_args(audio_path)
+            )
+
+        logger.info(f"Audio extracted to: {audio_path}")
+        return audio_path
+
+    except ffmpeg.FFmpegError as e:
+        logger.error(f"Error extracting audio: {str(e)}")
+        raise PipelineError(500, f"Error extracting audio: {str(e)}")
+
+
+def target_bitrate_kbps(duration: float, size_limit: int = config.OPENAI_SIZE_LIMIT) -> int:
+    """
+    Highest bitrate that keeps duration seconds of audio under size_limit,
+    clamped to the speech range. At the floor the output may still be too
+    large; the segmenter splits it afterwards.
+    """
+    kbps = int(size_limit * SIZE_SAFETY_MARGIN * 8 / duration / 1000)
+    return max(config.MIN_AUDIO_BITRATE_KBPS, min(config.MAX_AUDIO_BITRATE_KBPS, kbps))
+
+
+async def compress_audio(audio_path: Path, compressed_path: Path, duration: Optional[float] = None) -> Path:
+    """Re-encode audio in a single streaming pass sized for OpenAI's upload limit"""
+    try:
+        if duration is None:
+            duration = await ffmpeg.probe_duration(audio_path)
+        bitrate = target_bitrate_kbps(duration)
+        audio_size = os.path.getsize(audio_path)
+        logger.info(
+            f"Audio file size ({audio_size/(1024*1024):.2f} MB) exceeds OpenAI limit. "
+            f"Compressing {duration:.0f}s at {bitrate}k..."
+        )
+
+        await ffmpeg.ffmpeg(
+            "-i", str(audio_path),
+            *transcode_args(compressed_path, f"{bitrate}k")
+        )
+
+        logger.info(f"Compressed size: {os.path.getsize(compressed_path)/(1024*1024):.2f} MB")
+        return compressed_path
+
+    except ffmpeg.FFmpegError as e:
+        logger.error(f"Error compressing audio: {str(e)}")
+        raise PipelineError(500, f"Error compressing audio: {str(e)}")
@@ -0,0 +1,205 @@
+"""
+In-process metrics, exposed at /metrics in the Prometheus text format.
+
+Counters, gauges and histograms register themselves in a module-level
+registry. They are updated without locks: everything that records runs on
+the event loop thread. Values are per process, so scrape every worker.
+
+Pipeline stages are timed with timed(stage), as a context manager or as a
+decorator on coroutine functions:
+
+    with metrics.timed("upload"):
+        form = await stream_multipart_to_disk(request)
+
+    @metrics.timed("whisper")
+    async def _transcribe_chunk(...): ...
+
+Each run is observed in stage_duration_seconds{stage=...}; one that raises
+also counts in stage_errors_total. record_bytes() tracks the data volume
+going into and out of a stage.
+"""
+import math
+import time
+import asyncio
+import functools
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upload and Whisper stages take minutes, header-sized work milliseconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labels)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Yield (suffix, label string, value)"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    """A value that goes up and down; with function, read when scraped"""
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self._function is not None:
+            yield "", "", self._function()
+            return
+        for key, value in self._values.items():
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self):
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield "_bucket", _format_labels(self.labelnames, key, le), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds", "Duration of pipeline stages", ["stage"]
+)
+STAGE_ERRORS = Counter(
+    "stage_errors_total", "Pipeline stage runs that raised", ["stage"]
+)
+STAGE_BYTES = Counter(
+    "stage_bytes_total", "Bytes read (in) and produced (out) by pipeline stages", ["stage", "direction"]
+)
+
+
+class timed:
+    """Observe the duration of a block, or of every call to a coroutine function"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.stage)
+        # A cancelled request is not a failure of the stage
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            STAGE_ERRORS.inc(stage=self.stage)
+        return False
+
+    def __call__(self, func):
+        stage = self.stage
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with timed(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+
+
+def record_bytes(stage: str, bytes_in: int = 0, bytes_out: int = 0) -> None:
+    if bytes_in:
+        STAGE_BYTES.inc(bytes_in, stage=stage, direction="in")
+    if bytes_out:
+        STAGE_BYTES.inc(bytes_out, stage=stage, direction="out")
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
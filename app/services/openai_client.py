@@ -0,0 +1,150 @@
+"""
+Application-wide async OpenAI client.
+
+Every router goes through this module instead of building its own client:
+one AsyncOpenAI over a pooled httpx transport, a semaphore bounding the
+number of in-flight requests, exponential backoff on 429/5xx and
+connection errors, and latency counters per call type.
+
+The openai and httpx packages are imported on first use: they account for
+most of the application's import time and are not needed to serve
+anything but transcription and export calls.
+"""
+import time
+import random
+import asyncio
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional
+import app.config as config
+from app.services import metrics
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_MAX = 30.0
+
+_client: Optional["AsyncOpenAI"] = None
+_slots = asyncio.Semaphore(config.OPENAI_MAX_CONCURRENCY)
+
+# Per call type: count, errors, retries, total and max latency in seconds
+latency: Dict[str, Dict[str, float]] = {}
+
+REQUEST_SECONDS = metrics.Histogram(
+    "openai_request_duration_seconds", "OpenAI API calls, slot waits, retries and backoff included", ["call"]
+)
+REQUEST_RETRIES = metrics.Counter("openai_retries_total", "Retried OpenAI API attempts", ["call"])
+REQUEST_ERRORS = metrics.Counter("openai_errors_total", "OpenAI API calls that failed after retries", ["call"])
+
+
+def get_client() -> "AsyncOpenAI":
+    """Return the shared client, creating it on first use"""
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.OPENAI_MAX_CONCURRENCY,
+                max_keepalive_connections=config.OPENAI_MAX_CONCURRENCY
+            ),
+            timeout=httpx.Timeout(config.OPENAI_TIMEOUT, connect=10.0)
+        )
+        _client = AsyncOpenAI(
+            api_key=config.OPENAI_API_KEY,
+            base_url=config.OPENAI_BASE_URL,
+            http_client=http_client,
+            max_retries=0  # retries are handled by _call
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _is_retryable(error: Exception) -> bool:
+    from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * (0.5 + random.random() / 2)
+
+
+def _record(name: str, elapsed: float, retries: int, failed: bool) -> None:
+    stats = latency.setdefault(
+        name, {"count": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+    )
+    stats["count"] += 1
+    stats["retries"] += retries
+    stats["total_seconds"] += elapsed
+    stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+    if failed:
+        stats["errors"] += 1
+    REQUEST_SECONDS.observe(elapsed, call=name)
+    if retries:
+        REQUEST_RETRIES.inc(retries, call=name)
+    if failed:
+        REQUEST_ERRORS.inc(call=name)
+
+
+async def _call(name: str, request: Callable[[], Awaitable]):
+    """Run request under the concurrency limit, retrying transient failures"""
+    attempt = 0
+    start = time.perf_counter()
+    while True:
+        try:
+            # A slot per attempt, released before any backoff sleep
+            async with _slots:
+                response = await request()
+            _record(name, time.perf_counter() - start, attempt, failed=False)
+            return response
+        except Exception as e:
+            if not _is_retryable(e) or attempt >= config.OPENAI_MAX_RETRIES:
+                _record(name, time.perf_counter() - start, attempt, failed=True)
+                raise
+            delay = _retry_delay(e, attempt)
+            attempt += 1
+            logger.warning(f"OpenAI {name} failed ({str(e)}), retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def transcribe(audio_path: Path, **kwargs):
+    """audio.transcriptions.create for a file on disk"""
+    async def request():
+        # Reopened per attempt: a retried upload must start from byte 0
+        with open(audio_path, "rb") as audio_file:
+            return await get_client().audio.transcriptions.create(file=audio_file, **kwargs)
+    return await _call("audio.transcriptions", request)
+
+
+async def chat(**kwargs):
+    """chat.completions.create"""
+    return await _call("chat.completions", lambda: get_client().chat.completions.create(**kwargs))
+
+
+async def list_models():
+    return await _call("models.list", lambda: get_client().models.list())
+
+
+def get_metrics() -> Dict[str, Dict[str, float]]:
+    return {
+        name: {**stats, "avg_seconds": stats["total_seconds"] / stats["count"] if stats["count"] else 0.0}
+        for name, stats in latency.items()
+    }
@@ -0,0 +1,55 @@
+"""
+Password hashing off the event loop.
+
+bcrypt costs 100-300 ms of CPU per call. Hashing and verification run on a
+bounded thread pool (the bcrypt backend releases the GIL, so threads use
+every core) and the handlers only await the result. The cost comes from
+PASSWORD_BCRYPT_ROUNDS; hashes made with other parameters are replaced
+transparently on the next successful login.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=config.PASSWORD_BCRYPT_ROUNDS
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+
+async def _run(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check password against password_hash. Returns (valid, new_hash), where
+    new_hash is set when the stored hash should be replaced because the
+    hashing parameters changed.
+    """
+    if not password_hash:
+        return False, None
+    try:
+        return await _run(_context.verify_and_update, password, password_hash)
+    except ValueError:
+        logger.warning("Stored password hash could not be parsed")
+        return False, None
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
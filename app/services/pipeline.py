@@ -0,0 +1,83 @@
+"""
+Shared pieces of the transcription pipeline.
+
+Synchronous CPU-bound stages belong here so they can run inside the
+worker process pool started by app.services.transcription.
+"""
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    """
+    Stage failure carrying the HTTP status to report.
+    Unlike HTTPException it survives pickling across the process pool.
+    """
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Decoded PCM is processed this many frames / samples at a time, so memory
+# stays bounded for multi-hour recordings
+VAD_BLOCK_FRAMES = 8192
+COPY_BLOCK_SAMPLES = 1 << 20
+
+
+def trim_silence_pcm(
+    pcm_path: str,
+    output_path: str,
+    sample_rate: int,
+    threshold_db: float,
+    frame_ms: int,
+    max_silence: float,
+    keep_silence: float
+) -> Tuple[List[Tuple[float, float]], float]:
+    """
+    Energy-based voice activity detection on mono s16le PCM: every silence
+    longer than max_silence seconds is shortened to keep_silence seconds
+    (half kept on each side) and the remaining audio is written to
+    output_path. Returns the kept (start, end) intervals in seconds of the
+    original audio, which map trimmed timestamps back, and the original
+    duration.
+    """
+    import numpy as np
+
+    samples = np.memmap(pcm_path, dtype="<i2", mode="r")
+    frame = max(1, sample_rate * frame_ms // 1000)
+    frame_count = len(samples) // frame
+
+    # Frame level in dBFS
+    levels = np.empty(frame_count, dtype=np.float32)
+    for first in range(0, frame_count, VAD_BLOCK_FRAMES):
+        last = min(first + VAD_BLOCK_FRAMES, frame_count)
+        frames = samples[first * frame:last * frame].reshape(-1, frame).astype(np.float32)
+        power = np.mean(frames * frames, axis=1) / 32768.0 ** 2
+        levels[first:last] = 10 * np.log10(power + 1e-12)
+
+    # Runs of silent frames: +1 where a run starts, -1 one past its end
+    silent = (levels < threshold_db).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], silent, [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+
+    max_frames = int(max_silence * 1000 / frame_ms)
+    padding = int(keep_silence * 1000 / frame_ms / 2)
+    long_runs = (run_ends - run_starts) > max(max_frames, 2 * padding)
+    cut_starts = (run_starts[long_runs] + padding) * frame
+    cut_ends = (run_ends[long_runs] - padding) * frame
+
+    intervals = [
+        (int(start), int(end))
+        for start, end in zip([0, *cut_ends], [*cut_starts, len(samples)])
+        if end > start
+    ]
+    with open(output_path, "wb") as out:
+        for start, end in intervals:
+            for block in range(start, end, COPY_BLOCK_SAMPLES):
+                out.write(samples[block:min(end, block + COPY_BLOCK_SAMPLES)].tobytes())
+
+    return [(start / sample_rate, end / sample_rate) for start, end in intervals], len(samples) / sample_rate
@@ -0,0 +1,116 @@
+"""
+Silence trimming before transcription.
+
+Whisper is billed per audio minute and every byte is uploaded, so long
+pauses cost money and latency without adding text. When AUDIO_PREPROCESS
+is set, the audio is decoded to mono 16kHz PCM, frames quieter than
+SILENCE_THRESHOLD_DB are found with a vectorized energy VAD in the
+transcription process pool, and every silence longer than VAD_MAX_SILENCE
+is shortened to VAD_KEEP_SILENCE before re-encoding.
+
+The kept intervals form a TimeMap from the trimmed timeline back to the
+original, applied to the Whisper segments so stored timestamps (and
+SRT/VTT exports) still match the uploaded recording.
+"""
+import os
+import asyncio
+import logging
+from bisect import bisect_right
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import List, Optional, Tuple
+import app.config as config
+from app.models import TranscriptSegment
+from app.services import metrics, pipeline
+from app.services.extraction import transcode_args
+from app.utils import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+SECONDS_IN = metrics.Counter("preprocess_input_seconds_total", "Audio seconds before silence trimming")
+SECONDS_SAVED = metrics.Counter("preprocess_saved_seconds_total", "Audio seconds removed before transcription")
+
+
+class TimeMap:
+    """Maps times in trimmed audio back to the original recording"""
+
+    def __init__(self, intervals: List[Tuple[float, float]]):
+        self.intervals = intervals  # kept (start, end) in the original
+        self.starts = []  # where each interval starts in the trimmed audio
+        position = 0.0
+        for start, end in intervals:
+            self.starts.append(position)
+            position += end - start
+
+    def original(self, t: float) -> float:
+        index = max(0, bisect_right(self.starts, t) - 1)
+        return self.intervals[index][0] + (t - self.starts[index])
+
+    def remap(self, segments: List[TranscriptSegment]) -> List[TranscriptSegment]:
+        return [
+            TranscriptSegment(start=self.original(segment.start), end=self.original(segment.end), text=segment.text)
+            for segment in segments
+        ]
+
+
+async def trim_silence(
+    audio_path: Path,
+    output_path: Path,
+    executor: Optional[Executor] = None
+) -> Optional[Tuple[Path, TimeMap]]:
+    """
+    Write audio_path without its long silences to output_path (MP3) and
+    return it with its TimeMap, or None when trimming would save less than
+    VAD_MIN_SAVED of the duration and the original is better sent as is
+    """
+    pcm_path = output_path.with_suffix(".pcm")
+    trimmed_pcm_path = output_path.with_suffix(".trimmed.pcm")
+    try:
+        await ffmpeg.ffmpeg(
+            "-i", str(audio_path),
+            "-vn", "-ac", "1", "-ar", str(config.SPEECH_SAMPLE_RATE),
+            "-f", "s16le", str(pcm_path)
+        )
+        loop = asyncio.get_running_loop()
+        intervals, duration = await loop.run_in_executor(
+            executor,
+            pipeline.trim_silence_pcm,
+            str(pcm_path),
+            str(trimmed_pcm_path),
+            config.SPEECH_SAMPLE_RATE,
+            config.SILENCE_THRESHOLD_DB,
+            config.VAD_FRAME_MS,
+            config.VAD_MAX_SILENCE,
+            config.VAD_KEEP_SILENCE
+        )
+
+        kept = sum(end - start for start, end in intervals)
+        saved = duration - kept
+        SECONDS_IN.inc(duration)
+        if not intervals or saved < duration * config.VAD_MIN_SAVED:
+            logger.info(f"Silence trimming of {audio_path.name} would save {saved:.1f}s of {duration:.1f}s, skipped")
+            return None
+
+        await ffmpeg.ffmpeg(
+            "-f", "s16le", "-ac", "1", "-ar", str(config.SPEECH_SAMPLE_RATE),
+            "-i", str(trimmed_pcm_path),
+            *transcode_args(output_path)
+        )
+        SECONDS_SAVED.inc(saved)
+        metrics.record_bytes("preprocessing", os.path.getsize(audio_path), os.path.getsize(output_path))
+        logger.info(
+            f"Trimmed {saved:.1f}s of silence from {audio_path.name} "
+            f"({duration:.1f}s -> {kept:.1f}s, {saved / duration:.0%} saved)"
+        )
+        return output_path, TimeMap(intervals)
+
+    except Exception as e:
+        # Optional stage: any failure (empty decode, broken process pool...)
+        # leaves the untrimmed audio to be transcribed
+        logger.warning(f"Silence trimming failed, sending the original audio: {str(e)}", exc_info=True)
+        return None
+
+    finally:
+        for path in (pcm_path, trimmed_pcm_path):
+            if path.exists():
+                os.remove(path)
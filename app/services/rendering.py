@@ -0,0 +1,75 @@
+"""
+Process pool for document rendering.
+
+python-docx and FPDF layout are pure-Python CPU work; running them inside
+an async handler stalls every other request on the worker. Exports send
+the builders in app.utils.document_converter here instead, with a
+per-render timeout and queue-depth counters.
+"""
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+from fastapi import HTTPException
+import app.config as config
+from app.services import metrics
+from app.utils import document_converter
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# queued: submitted and not finished yet (waiting or running)
+stats = {"queued": 0, "max_queued": 0, "completed": 0, "failed": 0, "timeouts": 0}
+
+metrics.Gauge("render_queue_depth", "Documents submitted to the render pool and not finished", function=lambda: stats["queued"])
+
+
+def start() -> None:
+    global _pool
+    # Each worker builds the branded templates once, before its first render
+    _pool = ProcessPoolExecutor(
+        max_workers=config.RENDER_WORKERS,
+        initializer=document_converter.load_templates
+    )
+    logger.info(f"Started render pool with {config.RENDER_WORKERS} processes")
+
+
+def stop() -> None:
+    global _pool
+    if _pool:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def render(builder: Callable, *args, timeout: float = config.RENDER_TIMEOUT):
+    """
+    Run builder(*args) in the render pool and return its result.
+    builder must be a picklable module-level function.
+    """
+    loop = asyncio.get_running_loop()
+    stats["queued"] += 1
+    stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+    try:
+        with metrics.timed("rendering"):
+            result = await asyncio.wait_for(loop.run_in_executor(_pool, builder, *args), timeout)
+        stats["completed"] += 1
+        if isinstance(result, (str, os.PathLike)):
+            metrics.record_bytes("rendering", bytes_out=os.path.getsize(result))
+        return result
+    except asyncio.TimeoutError:
+        # The worker process cannot be interrupted; it finishes in the
+        # background and its output is discarded
+        stats["timeouts"] += 1
+        logger.error(f"Rendering with {builder.__name__} timed out after {timeout}s")
+        raise HTTPException(status_code=504, detail="Document rendering timed out")
+    except Exception:
+        stats["failed"] += 1
+        raise
+    finally:
+        stats["queued"] -= 1
+
+
+def get_stats() -> dict:
+    return {**stats, "workers": config.RENDER_WORKERS}
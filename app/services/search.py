@@ -0,0 +1,273 @@
+"""
+Full-text search over transcripts.
+
+Transcripts are indexed as rows of transcript_chunks: one per Whisper
+segment (with its timestamps) or, for edited text, one per paragraph. Each
+row records its character span in the transcript, so an edit reindexes
+only the chunks it touches (reindex_range). The inverted index depends on
+the database:
+
+    postgresql  GIN index on to_tsvector('simple', text), ranked with ts_rank
+    sqlite      FTS5 table over transcript_chunks, ranked with bm25
+
+Other databases fall back to an unranked substring match.
+"""
+import re
+import logging
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import delete, func, select, text as sql, update
+from app.db import SessionLocal, engine
+from app.models import SearchHit
+from app.models.search import TS_CONFIG, TranscriptChunk
+from app.models.transcription import Transcription
+from app.services import segments
+
+logger = logging.getLogger(__name__)
+
+MAX_HITS = 100
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# External-content FTS5 table kept in sync with transcript_chunks by triggers
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transcript_fts USING fts5(
+        text, content='transcript_chunks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS transcript_chunks_ai AFTER INSERT ON transcript_chunks BEGIN
+        INSERT INTO transcript_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transcript_chunks_ad AFTER DELETE ON transcript_chunks BEGIN
+        INSERT INTO transcript_fts(transcript_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+]
+
+SQLITE_SEARCH = """
+    SELECT c.file_id, t.filename, c.start, c."end",
+           snippet(transcript_fts, 0, :hl_start, :hl_end, '…', 16) AS snippet,
+           -bm25(transcript_fts) AS score
+    FROM transcript_fts
+    JOIN transcript_chunks c ON c.id = transcript_fts.rowid
+    LEFT JOIN transcriptions t ON t.file_id = c.file_id
+    WHERE transcript_fts MATCH :query {user_filter}
+    ORDER BY bm25(transcript_fts)
+    LIMIT :limit
+"""
+
+
+async def init() -> None:
+    """Create the dialect-specific index structures not covered by create_all"""
+    if engine.dialect.name == "sqlite":
+        async with engine.begin() as conn:
+            for statement in SQLITE_FTS_DDL:
+                await conn.execute(sql(statement))
+
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def _paragraphs(text: str, offset: int = 0) -> Iterator[Tuple[int, int, str]]:
+    """Yield (start, end, paragraph) for the non-blank paragraphs of text"""
+    position = 0
+    for match in [*PARAGRAPH_BREAK.finditer(text), None]:
+        end = match.start() if match else len(text)
+        paragraph = text[position:end]
+        stripped = paragraph.strip()
+        if stripped:
+            start = position + len(paragraph) - len(paragraph.lstrip())
+            yield offset + start, offset + start + len(stripped), stripped
+        if match:
+            position = match.end()
+
+
+def _chunks(file_id: str, user_id: Optional[int], text: str, packed_segments: Optional[dict]) -> List[TranscriptChunk]:
+    if not packed_segments:
+        return [
+            TranscriptChunk(file_id=file_id, user_id=user_id, char_start=start, char_end=end, text=paragraph)
+            for start, end, paragraph in _paragraphs(text)
+        ]
+
+    chunks = []
+    cursor = 0
+    for start, end, segment_text in segments.iter_packed(packed_segments):
+        if not segment_text:
+            continue
+        # Segments appear in the text in order; a span is only recorded
+        # when found, otherwise edits fall back to a full reindex
+        char_start = text.find(segment_text, cursor) if cursor is not None else -1
+        if char_start < 0:
+            cursor = None
+            char_start = char_end = None
+        else:
+            char_end = cursor = char_start + len(segment_text)
+        chunks.append(TranscriptChunk(
+            file_id=file_id, user_id=user_id, start=start, end=end,
+            char_start=char_start, char_end=char_end, text=segment_text
+        ))
+    return chunks
+
+
+async def index_transcript(
+    file_id: str,
+    text: str,
+    packed_segments: Optional[dict] = None,
+    user_id: Optional[int] = None
+) -> None:
+    """(Re)index a transcript, replacing whatever was indexed for it before"""
+    async with SessionLocal() as db:
+        await db.execute(delete(TranscriptChunk).where(TranscriptChunk.file_id == file_id))
+        db.add_all(_chunks(file_id, user_id, text, packed_segments))
+        await db.commit()
+
+
+async def reindex_range(
+    file_id: str,
+    text: str,
+    old_start: int,
+    old_end: int,
+    delta: int,
+    user_id: Optional[int] = None
+) -> None:
+    """
+    Reindex after text[old_start:old_end] of the previous version was
+    replaced, changing its length by delta. text is the new version.
+    Chunks overlapping the edit are replaced by paragraphs of the new text,
+    keeping the time span of the segments they replace; later chunks are
+    shifted. Falls back to a full reindex when spans are unknown.
+    """
+    async with SessionLocal() as db:
+        unknown_spans = await db.scalar(
+            select(func.count()).select_from(TranscriptChunk).where(
+                TranscriptChunk.file_id == file_id, TranscriptChunk.char_start.is_(None)
+            )
+        )
+        if unknown_spans:
+            await db.rollback()
+            await index_transcript(file_id, text, user_id=user_id)
+            return
+
+        # Chunks touching the edit, adjacent ones included so merged or
+        # split paragraphs are rebuilt whole
+        touched = (await db.execute(
+            select(TranscriptChunk.id, TranscriptChunk.char_start, TranscriptChunk.char_end,
+                   TranscriptChunk.start, TranscriptChunk.end)
+            .where(
+                TranscriptChunk.file_id == file_id,
+                TranscriptChunk.char_start <= old_end,
+                TranscriptChunk.char_end >= old_start
+            )
+        )).all()
+
+        region_start = min([old_start, *(chunk.char_start for chunk in touched)])
+        region_end = max([old_end, *(chunk.char_end for chunk in touched)])
+        starts = [chunk.start for chunk in touched if chunk.start is not None]
+        ends = [chunk.end for chunk in touched if chunk.end is not None]
+
+        if touched:
+            await db.execute(delete(TranscriptChunk).where(TranscriptChunk.id.in_([chunk.id for chunk in touched])))
+        if delta:
+            await db.execute(
+                update(TranscriptChunk)
+                .where(TranscriptChunk.file_id == file_id, TranscriptChunk.char_start >= region_end)
+                .values(
+                    char_start=TranscriptChunk.char_start + delta,
+                    char_end=TranscriptChunk.char_end + delta
+                )
+            )
+        db.add_all([
+            TranscriptChunk(
+                file_id=file_id, user_id=user_id,
+                start=min(starts) if starts else None, end=max(ends) if ends else None,
+                char_start=start, char_end=end, text=paragraph
+            )
+            for start, end, paragraph in _paragraphs(text[region_start:region_end + delta], region_start)
+        ])
+        await db.commit()
+
+
+def _fts5_query(query: str) -> str:
+    """Quote every term so user input is never parsed as FTS5 syntax"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+async def _search_sqlite(db, query: str, user_id: Optional[int], limit: int):
+    statement = SQLITE_SEARCH.format(user_filter="AND c.user_id = :user_id" if user_id is not None else "")
+    params = {
+        "query": _fts5_query(query),
+        "limit": limit,
+        "hl_start": HIGHLIGHT_START,
+        "hl_end": HIGHLIGHT_END,
+    }
+    if user_id is not None:
+        params["user_id"] = user_id
+    return (await db.execute(sql(statement), params)).mappings().all()
+
+
+async def _search_postgres(db, query: str, user_id: Optional[int], limit: int):
+    ts_query = func.plainto_tsquery(TS_CONFIG, query)
+    ts_vector = func.to_tsvector(TS_CONFIG, TranscriptChunk.text)
+    ranked = (
+        select(
+            TranscriptChunk.file_id,
+            TranscriptChunk.start,
+            TranscriptChunk.end,
+            TranscriptChunk.text,
+            func.ts_rank(ts_vector, ts_query).label("score")
+        )
+        .where(ts_vector.op("@@")(ts_query))
+        .order_by(func.ts_rank(ts_vector, ts_query).desc())
+        .limit(limit)
+    )
+    if user_id is not None:
+        ranked = ranked.where(TranscriptChunk.user_id == user_id)
+    ranked = ranked.subquery()
+
+    # Headlines are expensive, so only the returned rows get one
+    headline_options = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=32, MinWords=12"
+    statement = (
+        select(
+            ranked.c.file_id,
+            Transcription.filename,
+            ranked.c.start,
+            ranked.c.end,
+            func.ts_headline(TS_CONFIG, ranked.c.text, ts_query, headline_options).label("snippet"),
+            ranked.c.score
+        )
+        .outerjoin(Transcription, Transcription.file_id == ranked.c.file_id)
+        .order_by(ranked.c.score.desc())
+    )
+    return (await db.execute(statement)).mappings().all()
+
+
+async def _search_fallback(db, query: str, user_id: Optional[int], limit: int):
+    statement = (
+        select(
+            TranscriptChunk.file_id,
+            Transcription.filename,
+            TranscriptChunk.start,
+            TranscriptChunk.end,
+            TranscriptChunk.text.label("snippet")
+        )
+        .outerjoin(Transcription, Transcription.file_id == TranscriptChunk.file_id)
+        .where(TranscriptChunk.text.ilike(f"%{query}%"))
+        .limit(limit)
+    )
+    if user_id is not None:
+        statement = statement.where(TranscriptChunk.user_id == user_id)
+    rows = (await db.execute(statement)).mappings().all()
+    return [{**row, "score": 0.0} for row in rows]
+
+
+async def search(query: str, user_id: Optional[int] = None, limit: int = 20) -> List[SearchHit]:
+    """Best-matching transcript chunks for query, optionally for one user"""
+    if not query.strip():
+        return []
+    limit = max(1, min(limit, MAX_HITS))
+    backend = {
+        "postgresql": _search_postgres,
+        "sqlite": _search_sqlite,
+    }.get(engine.dialect.name, _search_fallback)
+
+    async with SessionLocal() as db:
+        rows = await backend(db, query, user_id, limit)
+    return [SearchHit(**row) for row in rows]
@@ -0,0 +1,143 @@
+"""
+Split long audio at silences and transcribe the pieces concurrently.
+
+Audio longer than SEGMENT_MAX_SECONDS, or above the Whisper upload limit,
+is cut (stream copy, no re-encode) at the silence closest to each chunk
+boundary, the chunks are sent to the API in parallel under a shared
+concurrency limit, and the results are stitched back in order with their
+timestamps shifted to the original timeline. A long recording therefore
+takes about as long as its longest chunk.
+"""
+import os
+import re
+import asyncio
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Tuple
+import app.config as config
+from app.models import TranscriptSegment
+from app.utils import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+SILENCE_START_RE = re.compile(r"silence_start: (-?[\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end: (-?[\d.]+)")
+
+# Keep chunks comfortably below the limit: bitrate is never perfectly even
+SIZE_SAFETY_MARGIN = 0.9
+
+# Shared by every task so concurrent uploads do not multiply API load
+_chunk_slots = asyncio.Semaphore(config.TRANSCRIPTION_CHUNK_CONCURRENCY)
+
+ChunkTranscriber = Callable[[Path], Awaitable[Tuple[str, List[TranscriptSegment]]]]
+
+
+async def detect_silences(
+    audio_path: Path,
+    noise_db: int = config.SILENCE_THRESHOLD_DB,
+    min_duration: float = config.SILENCE_MIN_DURATION
+) -> List[Tuple[float, float]]:
+    """Return (start, end) pairs of the silent stretches in a file"""
+    stderr = await ffmpeg.ffmpeg(
+        "-i", str(audio_path),
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_duration}",
+        "-f", "null", "-"
+    )
+    log = stderr.decode(errors="replace")
+    starts = [max(0.0, float(s)) for s in SILENCE_START_RE.findall(log)]
+    ends = [float(e) for e in SILENCE_END_RE.findall(log)]
+    return list(zip(starts, ends))
+
+
+def plan_segments(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    max_length: float
+) -> List[Tuple[float, float]]:
+    """
+    Choose (start, end) cut points no longer than max_length seconds.
+    Each cut goes in the middle of the last silence inside the second half
+    of the window; without one, the window is cut at its hard limit.
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    segments = []
+    start = 0.0
+    while duration - start > max_length:
+        limit = start + max_length
+        candidates = [m for m in midpoints if start + max_length / 2 < m <= limit]
+        cut = candidates[-1] if candidates else limit
+        segments.append((start, cut))
+        start = cut
+    segments.append((start, duration))
+    return segments
+
+
+async def split_audio(audio_path: Path, segments: List[Tuple[float, float]]) -> List[Path]:
+    """Cut audio_path into one file per segment next to the original"""
+    chunk_paths = []
+    for index, (start, end) in enumerate(segments):
+        chunk_path = audio_path.with_name(f"{audio_path.stem}_part{index:03d}{audio_path.suffix}")
+        await ffmpeg.ffmpeg(
+            "-ss", f"{start:.3f}",
+            "-t", f"{end - start:.3f}",
+            "-i", str(audio_path),
+            "-vn", "-c:a", "copy",
+            str(chunk_path)
+        )
+        chunk_paths.append(chunk_path)
+    return chunk_paths
+
+
+def stitch(
+    results: List[Tuple[str, List[TranscriptSegment]]],
+    offsets: List[float]
+) -> Tuple[str, List[TranscriptSegment]]:
+    """Join chunk transcripts in order, shifting timestamps by each chunk's start"""
+    texts = []
+    segments = []
+    for (text, chunk_segments), offset in zip(results, offsets):
+        if text.strip():
+            texts.append(text.strip())
+        for segment in chunk_segments:
+            segments.append(TranscriptSegment(
+                start=segment.start + offset,
+                end=segment.end + offset,
+                text=segment.text
+            ))
+    return " ".join(texts), segments
+
+
+async def transcribe_in_segments(
+    audio_path: Path,
+    transcribe_chunk: ChunkTranscriber,
+    size_limit: int = config.OPENAI_SIZE_LIMIT,
+    duration: Optional[float] = None,
+    max_seconds: float = config.SEGMENT_MAX_SECONDS
+) -> Tuple[str, List[TranscriptSegment]]:
+    """
+    Split audio_path into chunks of at most max_seconds, and under the size
+    limit, and transcribe them concurrently
+    """
+    if duration is None:
+        duration = await ffmpeg.probe_duration(audio_path)
+    size = os.path.getsize(audio_path)
+    max_length = min(max_seconds, duration * size_limit * SIZE_SAFETY_MARGIN / size)
+
+    silences = await detect_silences(audio_path)
+    segments = plan_segments(duration, silences, max_length)
+    logger.info(f"Splitting {audio_path} ({duration:.0f}s) into {len(segments)} chunks")
+
+    chunk_paths = await split_audio(audio_path, segments)
+
+    async def run(chunk_path: Path):
+        async with _chunk_slots:
+            return await transcribe_chunk(chunk_path)
+
+    try:
+        results = await asyncio.gather(*(run(path) for path in chunk_paths))
+    finally:
+        for path in chunk_paths:
+            if path.exists():
+                os.remove(path)
+
+    return stitch(results, [start for start, _ in segments])
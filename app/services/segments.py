@@ -0,0 +1,117 @@
+"""
+Timestamped transcript segments in columnar form.
+
+Whisper's verbose output is stored once per transcript as
+RESULTS_DIR/{file_id}.segments.json: parallel start/end arrays and a
+single text string with offsets, so segment i is
+text[offsets[i]:offsets[i + 1]]. Subtitle exports are rendered from this
+without another API call. When the transcript is edited, realign() moves
+the edited words into the segments they replace, keeping the timestamps.
+"""
+import json
+import uuid
+import logging
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import app.config as config
+from app.models import TranscriptSegment
+
+logger = logging.getLogger(__name__)
+
+
+def pack(segments: List[TranscriptSegment]) -> dict:
+    """Columnar representation of a segment list"""
+    offsets = [0]
+    for segment in segments:
+        offsets.append(offsets[-1] + len(segment.text))
+    return {
+        "start": [round(segment.start, 3) for segment in segments],
+        "end": [round(segment.end, 3) for segment in segments],
+        "offsets": offsets,
+        "text": "".join(segment.text for segment in segments),
+    }
+
+
+def iter_packed(packed: dict) -> Iterator[Tuple[float, float, str]]:
+    """Yield (start, end, text) for every segment of a packed table"""
+    text = packed["text"]
+    offsets = packed["offsets"]
+    for i, (start, end) in enumerate(zip(packed["start"], packed["end"])):
+        yield start, end, text[offsets[i]:offsets[i + 1]].strip()
+
+
+def realign(packed: dict, text: str) -> dict:
+    """
+    Packed segments carrying text instead of their own: the words of both
+    are matched, outside the common prefix and suffix, and each segment
+    keeps its timestamps with the words now in its place. Replaced words
+    are spread over their segments proportionally; segments left without
+    words are dropped. CPU-bound on long edits, run it in a thread.
+    """
+    segment_words = [text_.split() for _, _, text_ in iter_packed(packed)]
+    old_words = [word for words in segment_words for word in words]
+    new_words = text.split()
+
+    prefix = 0
+    limit = min(len(old_words), len(new_words))
+    while prefix < limit and old_words[prefix] == new_words[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old_words[-1 - suffix] == new_words[-1 - suffix]:
+        suffix += 1
+    old_end = len(old_words) - suffix
+    new_end = len(new_words) - suffix
+    opcodes = SequenceMatcher(
+        None, old_words[prefix:old_end], new_words[prefix:new_end], autojunk=False
+    ).get_opcodes()
+
+    def new_index(index: int) -> int:
+        """Position in new_words of the boundary before old_words[index]"""
+        if index <= prefix:
+            return index
+        if index >= old_end:
+            return index - old_end + new_end
+        index -= prefix
+        for tag, i1, i2, j1, j2 in opcodes:
+            if i1 <= index < i2:
+                if tag == "equal":
+                    return prefix + j1 + index - i1
+                return prefix + j1 + (index - i1) * (j2 - j1) // (i2 - i1)
+        return new_end
+
+    realigned = []
+    boundary = 0
+    position = 0
+    for (start, end, _), words in zip(iter_packed(packed), segment_words):
+        boundary += len(words)
+        next_position = len(new_words) if boundary == len(old_words) else new_index(boundary)
+        if next_position > position:
+            realigned.append(TranscriptSegment(
+                start=start, end=end, text=" " + " ".join(new_words[position:next_position])
+            ))
+            position = next_position
+    return pack(realigned)
+
+
+def segments_path(file_id: str) -> Path:
+    return config.RESULTS_DIR / f"{file_id}.segments.json"
+
+
+def save(file_id: str, packed: dict) -> Path:
+    path = segments_path(file_id)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(packed, f, ensure_ascii=False)
+    tmp_path.replace(path)
+    return path
+
+
+def load(file_id: str) -> Optional[dict]:
+    """Return the packed segments of a transcript, or None if it has none"""
+    try:
+        with open(segments_path(file_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
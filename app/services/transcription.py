@@ -1,79 +1,468 @@
 import os
-import json
 import uuid
-import openai
 import asyncio
-from ..config import settings
-from ..models import TaskStatus, TranscriptionResult, TranscriptionRequest
-from ..utils.file_handler import get_file_path
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+import app.config as config
+from app.db import SessionLocal
+from app.models import TaskStatus, TranscriptionModel, TranscriptionResult, TranscriptionRequest, TranscriptSegment
+from app.models.task import TranscriptionTask
+from app.services import cache, extraction, metrics, openai_client, preprocessing, segmenter, segments, transcripts
+from app.services.pipeline import PipelineError
+from app.utils import ffmpeg
+from app.utils.fair_queue import FairQueue
+from app.utils.file_handler import get_file_path
 
-# Set OpenAI API key
-openai.api_key = settings.OPENAI_API_KEY
+logger = logging.getLogger(__name__)
 
-# Store tasks in memory (for simplicity - use a database in production)
-tasks = {}
+# Worker state, created by start_workers() on application startup.
+# The queue only carries task ids: the task itself lives in the database,
+# so pending work is recovered after a restart. A task being processed
+# holds a lease, refreshed by heartbeats in its updated_at: only tasks
+# whose lease expired are taken over, never one another process is still
+# running (rolling deploys, several app processes). Each batch is one lane of
+# the queue and every other task its own, so workers alternate between a
+# large batch and the uploads queued after it.
+_pool: Optional[ProcessPoolExecutor] = None
+_queue: Optional[FairQueue] = None
+_workers: List[asyncio.Task] = []
+_waiters: Dict[str, asyncio.Future] = {}
+# batch_id -> events set whenever one of its tasks finishes
+_batch_watchers: Dict[str, Set[asyncio.Event]] = {}
 
-async def transcribe_audio(file_id: str, request: TranscriptionRequest) -> TranscriptionResult:
+metrics.Gauge(
+    "transcription_queue_depth", "Transcription tasks waiting for a worker",
+    function=lambda: _queue.qsize() if _queue else 0
+)
+
+
+def to_result(task: TranscriptionTask) -> TranscriptionResult:
+    return TranscriptionResult(
+        task_id=task.id,
+        status=TaskStatus(task.status),
+        file_id=task.file_id,
+        text=task.text,
+        file_path=task.file_path,
+        error=task.error
+    )
+
+
+async def _set_status(task_id: str, **values) -> None:
+    async with SessionLocal() as db:
+        await db.execute(
+            update(TranscriptionTask)
+            .where(TranscriptionTask.id == task_id)
+            .values(**values)
+        )
+        await db.commit()
+
+
+async def start_workers() -> None:
+    """Start the process pool and the coroutines that feed it"""
+    global _pool, _queue, _workers
+    _pool = ProcessPoolExecutor(max_workers=config.TRANSCRIPTION_WORKERS)
+    _queue = FairQueue()
+    _workers = [
+        asyncio.create_task(_worker(i))
+        for i in range(config.TRANSCRIPTION_WORKERS)
+    ]
+    logger.info(f"Started {config.TRANSCRIPTION_WORKERS} transcription workers")
+    await recover_tasks()
+    _workers.append(asyncio.create_task(_recovery_loop()))
+
+
+async def stop_workers() -> None:
+    global _pool
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    if _pool:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def recover_tasks(include_pending: bool = True) -> None:
     """
-    Process a transcription request asynchronously
+    Re-enqueue tasks whose processing lease expired and, with
+    include_pending, tasks still waiting from a previous run. A pending
+    task queued by several processes is claimed by only one of them.
     """
-    task_id = str(uuid.uuid4())
-    
-    # Initialize task
-    task = TranscriptionResult(
-        task_id=task_id,
-        status=TaskStatus.PENDING
+    expired = TranscriptionTask.updated_at < datetime.utcnow() - timedelta(seconds=config.TASK_LEASE_SECONDS)
+    abandoned = and_(TranscriptionTask.status == TaskStatus.PROCESSING.value, expired)
+    condition = or_(TranscriptionTask.status == TaskStatus.PENDING.value, abandoned) if include_pending else abandoned
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(TranscriptionTask).where(condition).order_by(TranscriptionTask.created_at)
+        )
+        tasks = result.scalars().all()
+
+    for task in tasks:
+        lost = not (task.source_path and os.path.exists(task.source_path))
+        async with SessionLocal() as db:
+            # Only if still abandoned: its worker may have sent a heartbeat since
+            result = await db.execute(
+                update(TranscriptionTask)
+                .where(TranscriptionTask.id == task.id, or_(TranscriptionTask.status == TaskStatus.PENDING.value, abandoned))
+                .values(
+                    status=TaskStatus.FAILED.value if lost else TaskStatus.PENDING.value,
+                    error="Uploaded file was lost before processing" if lost else None
+                )
+            )
+            await db.commit()
+        if result.rowcount == 0 or lost:
+            continue
+        logger.info(f"Recovering transcription task {task.id}")
+        enqueue(task.id, task.batch_id or task.id)
+
+
+async def _recovery_loop() -> None:
+    """Take over tasks abandoned by a process that stopped mid-task"""
+    while True:
+        await asyncio.sleep(config.TASK_LEASE_SECONDS)
+        try:
+            await recover_tasks(include_pending=False)
+        except Exception as e:
+            logger.error(f"Task recovery failed: {str(e)}", exc_info=True)
+
+
+async def _heartbeat(task_id: str) -> None:
+    """Renew the lease of a task while it is processed"""
+    while True:
+        await asyncio.sleep(config.TASK_HEARTBEAT_INTERVAL)
+        try:
+            await _set_status(task_id, updated_at=datetime.utcnow())
+        except Exception as e:
+            logger.warning(f"Heartbeat of task {task_id} failed: {str(e)}")
+
+
+async def _worker(worker_id: int) -> None:
+    while True:
+        task_id = await _queue.get()
+        try:
+            await process_transcription(task_id)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} failed on task {task_id}: {str(e)}", exc_info=True)
+        finally:
+            _queue.task_done()
+
+
+def new_task(
+    file_id: str,
+    request: TranscriptionRequest,
+    file_path: Optional[Path] = None,
+    filename: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    user_id: Optional[int] = None,
+    batch_id: Optional[str] = None
+) -> TranscriptionTask:
+    """A pending task row for the caller to insert, then enqueue() once committed"""
+    return TranscriptionTask(
+        id=str(uuid.uuid4()),
+        status=TaskStatus.PENDING.value,
+        file_id=file_id,
+        user_id=user_id,
+        batch_id=batch_id,
+        filename=filename,
+        source_path=str(file_path) if file_path else get_file_path(file_id),
+        content_hash=content_hash,
+        language=request.language,
+        prompt=request.prompt
     )
-    tasks[task_id] = task
-    
-    # Start transcription in background
-    asyncio.create_task(process_transcription(task_id, file_id, request))
-    
-    return task
-
-async def process_transcription(task_id: str, file_id: str, request: TranscriptionRequest) -> None:
+
+
+def enqueue(task_id: str, lane: str) -> None:
+    """Hand a committed task to the workers; PENDING rows are also recovered at startup"""
+    _queue.put_nowait(task_id, lane)
+
+
+async def transcribe_audio(
+    file_id: str,
+    request: TranscriptionRequest,
+    file_path: Optional[Path] = None,
+    filename: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    user_id: Optional[int] = None,
+    batch_id: Optional[str] = None,
+    wait: bool = False
+) -> TranscriptionResult:
     """
-    Process the transcription using OpenAI Whisper API
+    Enqueue a transcription request and return its task immediately,
+    or once it has finished when wait is set
     """
-    task = tasks[task_id]
-    task.status = TaskStatus.PROCESSING
-    
+    task = new_task(file_id, request, file_path, filename, content_hash, user_id, batch_id)
+    task_id = task.id
+    async with SessionLocal() as db:
+        db.add(task)
+        await db.commit()
+    result = TranscriptionResult(task_id=task_id, status=TaskStatus.PENDING, file_id=file_id)
+
+    lane = batch_id or task_id
+    if not wait:
+        enqueue(task_id, lane)
+        return result
+
+    future = asyncio.get_running_loop().create_future()
+    _waiters[task_id] = future
+    enqueue(task_id, lane)
     try:
-        # Get file path
-        file_path = get_file_path(file_id)
-        
-        # Update with actual API call
-        with open(file_path, "rb") as audio_file:
-            # Call OpenAI Whisper API
-            response = await openai.Audio.atranscribe(
-                model="whisper-1",
-                file=audio_file,
-                language=request.language,
-                prompt=request.prompt,
-                response_format=request.response_format,
-                temperature=request.temperature
-            )
-        
-        # Save the transcription result
-        result_filename = f"{task_id}.json"
-        result_path = os.path.join(settings.RESULTS_DIR, result_filename)
-        
-        with open(result_path, "w") as f:
-            json.dump(response, f)
-        
-        # Update task with result
-        task.status = TaskStatus.COMPLETED
-        task.text = response.get("text", "")
-        task.file_path = result_filename
-        
+        return await _wait_for_task(task_id, future)
+    finally:
+        _waiters.pop(task_id, None)
+
+
+async def _wait_for_task(task_id: str, future: asyncio.Future) -> TranscriptionResult:
+    """
+    Result of a task, from the local worker's future or from the database:
+    another process may claim the task, and then the future never resolves
+    """
+    while True:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), config.TASK_WAIT_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            task = await get_task(task_id)
+            if task is None or task.status == TaskStatus.FAILED.value:
+                raise PipelineError(500, task.error if task else "Transcription task disappeared")
+            if task.status == TaskStatus.COMPLETED.value:
+                return to_result(task)
+
+
+async def _whisper(audio_path: Path, language: Optional[str], prompt: Optional[str], response_format: str = "json"):
+    return await openai_client.transcribe(
+        audio_path,
+        model=TranscriptionModel.WHISPER_1.value,
+        language=language if language else None,
+        prompt=prompt if prompt else None,
+        response_format=response_format
+    )
+
+
+def _segment_field(segment, name: str):
+    """Verbose segments are typed objects in recent openai releases, plain dicts in older ones"""
+    return segment[name] if isinstance(segment, dict) else getattr(segment, name)
+
+
+@metrics.timed("whisper")
+async def _transcribe_chunk(
+    audio_path: Path,
+    language: Optional[str],
+    prompt: Optional[str]
+) -> Tuple[str, List[TranscriptSegment]]:
+    """Transcribe a recording or one chunk of it, keeping its segment timestamps"""
+    metrics.record_bytes("whisper", bytes_in=os.path.getsize(audio_path))
+    transcription = await _whisper(audio_path, language, prompt, "verbose_json")
+    segments = [
+        TranscriptSegment(
+            start=_segment_field(segment, "start"),
+            end=_segment_field(segment, "end"),
+            text=_segment_field(segment, "text")
+        )
+        for segment in (getattr(transcription, "segments", None) or [])
+    ]
+    return transcription.text, segments
+
+
+async def _transcribe_file(task: TranscriptionTask, file_path: Path, temp_paths: List[Path]) -> dict:
+    """
+    Extract, compress and transcribe file_path, appending every intermediate
+    file to temp_paths. Returns {"text", "segments"} with the segments packed
+    (None for results cached before segments were kept). Results are cached
+    by upload hash and by normalized audio hash, so a duplicate upload skips
+    extraction and the API call.
+    """
+    content_hash = task.content_hash or await asyncio.to_thread(cache.file_sha256, file_path)
+    source_key = cache.cache_key(content_hash, task.language, task.prompt)
+    cached = await asyncio.to_thread(cache.get, source_key)
+    if cached:
+        logger.info(f"Transcription cache hit for upload {task.file_id}")
+        cache.record_hit()
+        return cached
+
+    audio_path = file_path
+
+    # Extract audio from video if needed
+    if file_path.suffix.lower() in config.SUPPORTED_VIDEO_FORMATS:
+        with metrics.timed("extraction"):
+            audio_path = await extraction.extract_audio(file_path, config.UPLOAD_DIR / task.file_id)
+        temp_paths.append(audio_path)
+        metrics.record_bytes("extraction", os.path.getsize(file_path), os.path.getsize(audio_path))
+
+    # Shorten long silences: fewer billed minutes and bytes to upload
+    time_map = None
+    if config.AUDIO_PREPROCESS:
+        trimmed_path = config.UPLOAD_DIR / f"{task.file_id}_trimmed.mp3"
+        temp_paths.append(trimmed_path)
+        with metrics.timed("preprocessing"):
+            trimmed = await preprocessing.trim_silence(audio_path, trimmed_path, _pool)
+        if trimmed:
+            audio_path, time_map = trimmed
+
+    # If file is larger than OpenAI's limit, re-encode it once at the
+    # bitrate that fits (never below MIN_AUDIO_BITRATE_KBPS)
+    if os.path.getsize(audio_path) > config.OPENAI_SIZE_LIMIT:
+        compressed_path = config.UPLOAD_DIR / f"{task.file_id}_compressed.mp3"
+        temp_paths.append(compressed_path)
+        with metrics.timed("compression"):
+            compressed_path = await extraction.compress_audio(audio_path, compressed_path)
+        metrics.record_bytes("compression", os.path.getsize(audio_path), os.path.getsize(compressed_path))
+        audio_path = compressed_path
+
+    # The same recording uploaded in another container still normalizes to
+    # the same audio
+    audio_key = source_key
+    if audio_path != file_path:
+        audio_hash = await asyncio.to_thread(cache.file_sha256, audio_path)
+        audio_key = cache.cache_key(audio_hash, task.language, task.prompt)
+        cached = await asyncio.to_thread(cache.get, audio_key)
+        if cached:
+            logger.info(f"Transcription cache hit for audio of {task.file_id}")
+            cache.record_hit()
+            await asyncio.to_thread(cache.put, source_key, cached)
+            return cached
+
+    cache.record_miss()
+    logger.info(f"Transcribing audio: {audio_path}")
+    try:
+        duration = await ffmpeg.probe_duration(audio_path)
+    except (ffmpeg.FFmpegError, OSError) as e:
+        # Only needed to decide on splitting: send it whole if it fits
+        logger.warning(f"Could not probe the duration of {audio_path}: {str(e)}")
+        duration = None
+    if os.path.getsize(audio_path) > config.OPENAI_SIZE_LIMIT or (duration or 0) > config.SEGMENT_MAX_SECONDS:
+        # Long or still too large at the minimum bitrate: transcribe in
+        # parallel chunks, so the wait is that of the longest chunk
+        transcription_text, transcript_segments = await segmenter.transcribe_in_segments(
+            audio_path,
+            lambda chunk_path: _transcribe_chunk(chunk_path, task.language, task.prompt),
+            duration=duration
+        )
+    else:
+        # One verbose pass gives both the text and the segment timestamps
+        transcription_text, transcript_segments = await _transcribe_chunk(
+            audio_path, task.language, task.prompt
+        )
+
+    if time_map:
+        # Timestamps refer to the uploaded recording, not the trimmed audio
+        transcript_segments = time_map.remap(transcript_segments)
+
+    payload = {"text": transcription_text, "segments": segments.pack(transcript_segments)}
+    for key in {source_key, audio_key}:
+        await asyncio.to_thread(cache.put, key, payload)
+    return payload
+
+
+async def process_transcription(task_id: str) -> None:
+    """
+    Run the pipeline for a task: ffmpeg stages run as subprocesses, CPU-bound
+    Python stages in the process pool and the Whisper API call on the shared
+    async client, so the event loop is never blocked
+    """
+    async with SessionLocal() as db:
+        result = await db.execute(
+            update(TranscriptionTask)
+            .where(TranscriptionTask.id == task_id, TranscriptionTask.status == TaskStatus.PENDING.value)
+            .values(status=TaskStatus.PROCESSING.value)
+        )
+        await db.commit()
+        if result.rowcount == 0:
+            # Already claimed or finished
+            return
+        task = await db.get(TranscriptionTask, task_id)
+
+    file_path = Path(task.source_path)
+    temp_paths = [file_path]
+    error = None
+    heartbeat = asyncio.create_task(_heartbeat(task_id))
+
+    try:
+        with metrics.timed("transcription"):
+            transcription = await _transcribe_file(task, file_path, temp_paths)
+        transcription_text = transcription["text"]
+
+        # Save transcription result
+        result_path = await transcripts.save(
+            task.file_id,
+            transcription_text,
+            transcription.get("segments"),
+            user_id=task.user_id,
+            filename=task.filename,
+            language=task.language
+        )
+        logger.info(f"Transcription saved to: {result_path}")
+
+        await _set_status(
+            task_id,
+            status=TaskStatus.COMPLETED.value,
+            text=transcription_text,
+            file_path=result_path.name
+        )
+        result = TranscriptionResult(
+            task_id=task_id,
+            status=TaskStatus.COMPLETED,
+            file_id=task.file_id,
+            text=transcription_text,
+            file_path=result_path.name
+        )
+
     except Exception as e:
-        # Handle errors
-        task.status = TaskStatus.FAILED
-        task.error = str(e)
-
-async def get_task_status(task_id: str) -> TranscriptionResult:
-    """Get the status of a transcription task"""
-    if task_id not in tasks:
-        raise Exception("Task not found")
-    
-    return tasks[task_id]
\ No newline at end of file
+        logger.error(f"Error during transcription task {task_id}: {str(e)}", exc_info=True)
+        error = e
+        detail = e.detail if isinstance(e, PipelineError) else f"Transcription error: {str(e)}"
+        await _set_status(task_id, status=TaskStatus.FAILED.value, error=detail)
+
+    finally:
+        heartbeat.cancel()
+        # Clean up files
+        for path in set(temp_paths):
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+                    logger.info(f"Removed temporary file: {path}")
+            except Exception as e:
+                logger.error(f"Error during cleanup: {str(e)}")
+
+    for event in _batch_watchers.get(task.batch_id, ()):
+        event.set()
+
+    future = _waiters.get(task_id)
+    if future and not future.done():
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+@contextmanager
+def watch_batch(batch_id: str) -> Iterator[asyncio.Event]:
+    """
+    Event set whenever a task of the batch finishes in this process.
+    Tasks run by other processes are not seen; poll the database as well.
+    """
+    event = asyncio.Event()
+    _batch_watchers.setdefault(batch_id, set()).add(event)
+    try:
+        yield event
+    finally:
+        watchers = _batch_watchers.get(batch_id)
+        if watchers is not None:
+            watchers.discard(event)
+            if not watchers:
+                del _batch_watchers[batch_id]
+
+
+async def get_task(task_id: str) -> Optional[TranscriptionTask]:
+    async with SessionLocal() as db:
+        return await db.get(TranscriptionTask, task_id)
+
+
+async def get_task_status(task_id: str) -> Optional[TranscriptionResult]:
+    """Get the status of a transcription task, or None if it does not exist"""
+    task = await get_task(task_id)
+    return to_result(task) if task else None
@@ -0,0 +1,341 @@
+"""
+Transcript store.
+
+The transcriptions table is the record of every finished transcript: text,
+packed segments, owner and metadata. RESULTS_DIR/{file_id}.txt and
+{file_id}.segments.json are working copies for the export and download
+routes (content hashes, FileResponse); materialize() recreates them from
+the database when they are missing. Every write also refreshes the
+transcript's search index.
+
+Edits are applied as lists of range replacements against a version number
+(optimistic concurrency): a patch based on a stale version is rejected
+with VersionConflict. Each accepted patch is kept as a TranscriptRevision
+holding the operations and the text they replaced, so history costs the
+size of the edits rather than of the transcript. Whole-text saves (/edit/,
+/save/) are last-writer-wins: they are retried against the new version and
+only raise VersionConflict if they keep losing the race.
+
+Edits also move the changed words into the packed segments (see
+segments.realign), so subtitles follow the edited text.
+
+The working copies are rewritten from the database after every edit,
+serialized per transcript and re-checked against the current version, so
+racing edits cannot leave an older text on disk.
+
+History is listed with keyset pagination on (created_at, id), served by
+the (user_id, created_at, id) index, so a page costs the same at any depth.
+"""
+import json
+import uuid
+import base64
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.future import select
+import app.config as config
+from app.db import SessionLocal
+from app.models import TextEdit, TranscriptPage, TranscriptSummary, TranscriptVersion
+from app.models.transcription import Transcription, TranscriptRevision
+from app.services import search, segments
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 100
+
+# Whole-text saves retried after losing a race with another edit
+FULL_TEXT_RETRIES = 3
+
+# file_id -> (owner user_id,). Owners never change, so entries do not
+# expire; only transcripts found in the database are cached
+_owners: TTLCache[Tuple[Optional[int]]] = TTLCache(max_size=100000)
+
+# One lock per transcript so working-copy rewrites do not interleave
+_write_locks: Dict[str, asyncio.Lock] = {}
+
+
+class VersionConflict(Exception):
+    """A patch was based on a version that is no longer current"""
+    def __init__(self, current_version: int):
+        self.current_version = current_version
+        super().__init__(f"Transcript is at version {current_version}")
+
+
+def text_path(file_id: str) -> Path:
+    return config.RESULTS_DIR / f"{file_id}.txt"
+
+
+def _write_text(file_id: str, text: str) -> Path:
+    path = text_path(file_id)
+    # Unique per writer: other processes may be rewriting the same file
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    tmp_path.replace(path)
+    return path
+
+
+async def save(
+    file_id: str,
+    text: str,
+    packed_segments: Optional[dict] = None,
+    user_id: Optional[int] = None,
+    filename: Optional[str] = None,
+    language: Optional[str] = None
+) -> Path:
+    """Persist a finished transcript and write its working copies"""
+    async with SessionLocal() as db:
+        db.add(Transcription(
+            file_id=file_id,
+            user_id=user_id,
+            filename=filename,
+            language=language,
+            text=text,
+            segments=packed_segments
+        ))
+        await db.commit()
+    await search.index_transcript(file_id, text, packed_segments, user_id)
+
+    path = await asyncio.to_thread(_write_text, file_id, text)
+    if packed_segments:
+        await asyncio.to_thread(segments.save, file_id, packed_segments)
+    return path
+
+
+def apply_ops(text: str, ops: List[TextEdit]) -> Tuple[str, list]:
+    """
+    Apply range replacements, all relative to text, and return the new text
+    with the revision record [[start, end, text, replaced_text], ...].
+    Raises ValueError for out-of-range or overlapping operations.
+    """
+    ops = sorted(ops, key=lambda op: (op.start, op.end))
+    position = 0
+    for op in ops:
+        if op.start < position or op.end < op.start or op.end > len(text):
+            raise ValueError(f"Invalid edit range [{op.start}, {op.end})")
+        position = op.end
+
+    pieces = []
+    record = []
+    position = 0
+    for op in ops:
+        pieces.append(text[position:op.start])
+        pieces.append(op.text)
+        record.append([op.start, op.end, op.text, text[op.start:op.end]])
+        position = op.end
+    pieces.append(text[position:])
+    return "".join(pieces), record
+
+
+def diff_edit(old_text: str, new_text: str) -> TextEdit:
+    """Single replacement turning old_text into new_text, trimming the common prefix and suffix"""
+    prefix = 0
+    limit = min(len(old_text), len(new_text))
+    while prefix < limit and old_text[prefix] == new_text[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old_text[-1 - suffix] == new_text[-1 - suffix]:
+        suffix += 1
+    return TextEdit(start=prefix, end=len(old_text) - suffix, text=new_text[prefix:len(new_text) - suffix])
+
+
+async def apply_edits(
+    file_id: str,
+    ops: List[TextEdit],
+    base_version: Optional[int] = None
+) -> Optional[TranscriptVersion]:
+    """
+    Apply ops to a transcript and record the revision. With base_version,
+    raises VersionConflict unless it is the current version. Returns None
+    if the transcript does not exist.
+    """
+    async with SessionLocal() as db:
+        row = (await db.execute(
+            select(Transcription.text, Transcription.version, Transcription.user_id, Transcription.segments)
+            .where(Transcription.file_id == file_id)
+        )).first()
+        if row is None:
+            return None
+        if base_version is not None and base_version != row.version:
+            raise VersionConflict(row.version)
+
+        old_text = row.text or ""
+        new_text, record = apply_ops(old_text, ops)
+        if new_text == old_text:
+            return TranscriptVersion(file_id=file_id, version=row.version, length=len(old_text))
+        version = row.version + 1
+        values = {"text": new_text, "version": version}
+        if row.segments:
+            values["segments"] = await asyncio.to_thread(segments.realign, row.segments, new_text)
+
+        # The version check in the WHERE clause makes concurrent patches
+        # against the same base fail instead of overwriting each other
+        result = await db.execute(
+            update(Transcription)
+            .where(Transcription.file_id == file_id, Transcription.version == row.version)
+            .values(**values)
+        )
+        if result.rowcount == 0:
+            await db.rollback()
+            current = await db.scalar(select(Transcription.version).where(Transcription.file_id == file_id))
+            raise VersionConflict(current)
+        db.add(TranscriptRevision(file_id=file_id, version=version, ops=record))
+        await db.execute(
+            delete(TranscriptRevision).where(
+                TranscriptRevision.file_id == file_id,
+                TranscriptRevision.version <= version - config.TRANSCRIPT_MAX_REVISIONS
+            )
+        )
+        await db.commit()
+
+    # One range covering every operation, in old-text coordinates
+    delta = len(new_text) - len(old_text)
+    await search.reindex_range(file_id, new_text, record[0][0], record[-1][1], delta, row.user_id)
+    await _refresh_working_copy(file_id)
+    return TranscriptVersion(file_id=file_id, version=version, length=len(new_text))
+
+
+async def _current(file_id: str):
+    async with SessionLocal() as db:
+        return (await db.execute(
+            select(Transcription.text, Transcription.version, Transcription.segments)
+            .where(Transcription.file_id == file_id)
+        )).first()
+
+
+async def _refresh_working_copy(file_id: str) -> Path:
+    """
+    Rewrite the text and segment files from the database. Repeated while
+    the version changed during the write, so the last files written hold
+    the current text even when edits race across processes.
+    """
+    lock = _write_locks.setdefault(file_id, asyncio.Lock())
+    async with lock:
+        while True:
+            row = await _current(file_id)
+            path = await asyncio.to_thread(_write_text, file_id, row.text or "")
+            if row.segments:
+                await asyncio.to_thread(segments.save, file_id, row.segments)
+            latest = await _current(file_id)
+            if latest.version == row.version:
+                return path
+
+
+async def update_text(file_id: str, text: str) -> Path:
+    """
+    Replace a transcript's whole text (/edit/ and /save/). Stored as the
+    minimal replacement between the two versions; transcripts that predate
+    the database only get their file rewritten and reindexed.
+    """
+    for attempt in range(FULL_TEXT_RETRIES):
+        row = await _current(file_id)
+        if row is None:
+            await search.index_transcript(file_id, text)
+            return await asyncio.to_thread(_write_text, file_id, text)
+        try:
+            await apply_edits(file_id, [diff_edit(row.text or "", text)], base_version=row.version)
+            return text_path(file_id)
+        except VersionConflict:
+            if attempt == FULL_TEXT_RETRIES - 1:
+                raise
+            logger.info(f"Transcript {file_id} changed during a save, retrying")
+
+
+async def get(file_id: str) -> Optional[Transcription]:
+    async with SessionLocal() as db:
+        result = await db.execute(select(Transcription).where(Transcription.file_id == file_id))
+        return result.scalar_one_or_none()
+
+
+async def owner_of(file_id: str) -> Optional[int]:
+    """user_id owning a transcript, None if unowned or unknown"""
+    owner = _owners.get(file_id)
+    if owner is None:
+        async with SessionLocal() as db:
+            row = (await db.execute(
+                select(Transcription.user_id).where(Transcription.file_id == file_id)
+            )).first()
+        if row is None:
+            return None
+        owner = (row.user_id,)
+        _owners.put(file_id, owner)
+    return owner[0]
+
+
+async def materialize(file_id: str) -> Optional[Path]:
+    """
+    Return the transcript's text file, restoring it and its segments from
+    the database if missing, or None if the transcript does not exist
+    """
+    path = text_path(file_id)
+    if path.exists():
+        return path
+    transcription = await get(file_id)
+    if transcription is None:
+        return None
+    logger.info(f"Restoring working copy of transcript {file_id}")
+    if transcription.segments and not segments.segments_path(file_id).exists():
+        await asyncio.to_thread(segments.save, file_id, transcription.segments)
+    return await asyncio.to_thread(_write_text, file_id, transcription.text or "")
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for a malformed cursor"""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def list_for_user(user_id: int, limit: int = 20, cursor: Optional[str] = None) -> TranscriptPage:
+    """One page of a user's transcripts, newest first"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = (
+        select(
+            Transcription.id,
+            Transcription.file_id,
+            Transcription.filename,
+            Transcription.language,
+            Transcription.created_at
+        )
+        .where(Transcription.user_id == user_id)
+        .order_by(Transcription.created_at.desc(), Transcription.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Transcription.created_at < created_at,
+            and_(Transcription.created_at == created_at, Transcription.id < row_id)
+        ))
+
+    async with SessionLocal() as db:
+        rows = (await db.execute(query)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return TranscriptPage(
+        items=[
+            TranscriptSummary(
+                file_id=row.file_id,
+                filename=row.filename,
+                language=row.language,
+                created_at=row.created_at
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor
+    )
@@ -0,0 +1,310 @@
+"""
+Resumable uploads for large recordings.
+
+A client creates an upload with the file's name and size, then PUTs it in
+numbered parts of part_size bytes (the last one shorter), in any order and
+in parallel, resending any part that fails. Every part is streamed to a
+file of its own, checked, and copied to its offset of a file preallocated
+in UPLOAD_DIR while the upload is locked open, so nothing is held in
+memory, a completed upload is never written to, and completing the upload
+copies nothing: the file is queued for transcription where it lies.
+
+Received parts are rows of upload_parts, so a client that lost its
+connection asks for the upload's status and sends only the missing parts.
+Unfinished uploads are deleted, file included, after UPLOAD_SESSION_TTL.
+"""
+import os
+import uuid
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+from starlette.concurrency import run_in_threadpool
+import app.config as config
+from app.db import SessionLocal
+from app.models import TranscriptionRequest, UploadPartReceipt, UploadStatus
+from app.models.upload import UploadPart, UploadSession
+from app.services import metrics
+from app.services import transcription as transcription_service
+from app.utils.file_handler import validate_extension
+
+logger = logging.getLogger(__name__)
+
+OPEN = "open"
+COMPLETED = "completed"
+
+
+def part_count(upload: UploadSession) -> int:
+    return max(1, -(-upload.size // upload.part_size))
+
+
+def part_length(upload: UploadSession, number: int) -> int:
+    """Expected size of part number; only the last part is shorter"""
+    return min(upload.part_size, upload.size - (number - 1) * upload.part_size)
+
+
+def _preallocate(path: Path, size: int) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        if size and hasattr(os, "posix_fallocate"):
+            # Reserves the blocks, so a full disk fails here rather than mid-upload
+            os.posix_fallocate(fd, 0, size)
+        else:
+            os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+async def _closed_error(upload_id: str) -> HTTPException:
+    """Why an upload no longer takes parts: aborted or expired (404), or completed (409)"""
+    if await get(upload_id) is None:
+        return HTTPException(status_code=404, detail="Upload not found")
+    return HTTPException(status_code=409, detail="Upload is already completed")
+
+
+def _remove(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _copy_part(staged: Path, path: Path, offset: int) -> None:
+    """Copy a staged part to its offset in the upload file"""
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        with open(staged, "rb") as source:
+            while True:
+                block = source.read(config.UPLOAD_CHUNK_SIZE)
+                if not block:
+                    break
+                os.pwrite(fd, block, offset)
+                offset += len(block)
+    finally:
+        os.close(fd)
+
+
+async def create(
+    filename: str,
+    size: int,
+    user_id: Optional[int] = None,
+    language: Optional[str] = None,
+    prompt: Optional[str] = None
+) -> UploadSession:
+    """Validate the announced file and preallocate it in UPLOAD_DIR"""
+    file_ext = validate_extension(filename)
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="Upload size must be positive")
+    if size > config.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {config.MAX_FILE_SIZE/1024/1024}MB"
+        )
+
+    await cleanup_expired()
+
+    upload_id = str(uuid.uuid4())
+    path = config.UPLOAD_DIR / f"{upload_id}{file_ext}"
+    try:
+        await run_in_threadpool(_preallocate, path, size)
+    except OSError as e:
+        await run_in_threadpool(_remove, str(path))
+        logger.error(f"Could not preallocate {size} bytes for upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=507, detail="Not enough storage for this upload")
+
+    upload = UploadSession(
+        id=upload_id,
+        user_id=user_id,
+        status=OPEN,
+        filename=filename,
+        path=str(path),
+        size=size,
+        part_size=config.UPLOAD_PART_SIZE,
+        language=language,
+        prompt=prompt,
+        expires_at=datetime.utcnow() + timedelta(seconds=config.UPLOAD_SESSION_TTL)
+    )
+    async with SessionLocal() as db:
+        db.add(upload)
+        await db.commit()
+        await db.refresh(upload)
+    logger.info(f"Created upload {upload_id} for {filename} ({size} bytes)")
+    return upload
+
+
+async def get(upload_id: str) -> Optional[UploadSession]:
+    async with SessionLocal() as db:
+        return await db.get(UploadSession, upload_id)
+
+
+async def received_parts(upload_id: str) -> list:
+    """(number, size) of the parts stored so far, in order"""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(UploadPart.number, UploadPart.size)
+            .where(UploadPart.upload_id == upload_id)
+            .order_by(UploadPart.number)
+        )
+        return result.all()
+
+
+async def status(upload: UploadSession) -> UploadStatus:
+    parts = await received_parts(upload.id)
+    return UploadStatus(
+        upload_id=upload.id,
+        status=upload.status,
+        filename=upload.filename,
+        size=upload.size,
+        part_size=upload.part_size,
+        part_count=part_count(upload),
+        received_parts=[part.number for part in parts],
+        received_bytes=sum(part.size for part in parts),
+        expires_at=upload.expires_at,
+        task_id=upload.task_id
+    )
+
+
+async def write_part(
+    upload: UploadSession,
+    number: int,
+    body: AsyncIterator[bytes],
+    sha256: Optional[str] = None
+) -> UploadPartReceipt:
+    """
+    Stream one part to its offset in the upload file, verifying its length
+    and, when given, its SHA-256. Sending a part again overwrites it.
+    """
+    if upload.status != OPEN:
+        raise HTTPException(status_code=409, detail="Upload is already completed")
+    if not 1 <= number <= part_count(upload):
+        raise HTTPException(status_code=400, detail=f"Part number must be between 1 and {part_count(upload)}")
+
+    expected = part_length(upload, number)
+    digest = hashlib.sha256()
+    received = 0
+    buffer = bytearray()
+
+    # Staged in a file of its own: the upload file is only written under the
+    # lock that proves the upload is still open
+    path = Path(upload.path)
+    if not await run_in_threadpool(path.exists):
+        # Aborted, expired or completed and transcribed since it was loaded
+        raise await _closed_error(upload.id)
+    staged = path.with_name(f"{path.name}.{number}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(staged, "wb") as out:
+            async for chunk in body:
+                received += len(chunk)
+                if received > expected:
+                    raise HTTPException(status_code=400, detail=f"Part {number} must be {expected} bytes")
+                digest.update(chunk)
+                buffer += chunk
+                # Written in UPLOAD_CHUNK_SIZE blocks, one thread hop per block
+                if len(buffer) >= config.UPLOAD_CHUNK_SIZE:
+                    await run_in_threadpool(out.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(out.write, bytes(buffer))
+        metrics.record_bytes("upload", bytes_in=received)
+
+        if received != expected:
+            raise HTTPException(status_code=400, detail=f"Part {number} is incomplete: {received} of {expected} bytes")
+        part_hash = digest.hexdigest()
+        if sha256 and sha256.lower() != part_hash:
+            raise HTTPException(status_code=400, detail=f"Checksum mismatch for part {number}")
+
+        part = (UploadPart.upload_id == upload.id, UploadPart.number == number)
+        values = {"size": received, "sha256": part_hash}
+        async with SessionLocal() as db:
+            # The no-op update locks the upload row while it is open, so
+            # complete() and abort() wait until the part is in place
+            result = await db.execute(
+                update(UploadSession)
+                .where(UploadSession.id == upload.id, UploadSession.status == OPEN)
+                .values(status=OPEN)
+            )
+            if result.rowcount == 0:
+                await db.rollback()
+                raise await _closed_error(upload.id)
+            await run_in_threadpool(_copy_part, staged, path, (number - 1) * upload.part_size)
+            result = await db.execute(update(UploadPart).where(*part).values(**values))
+            if result.rowcount == 0:
+                db.add(UploadPart(upload_id=upload.id, number=number, **values))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # The same part was recorded concurrently: keep this receipt
+                await db.rollback()
+                await db.execute(update(UploadPart).where(*part).values(**values))
+                await db.commit()
+    finally:
+        await run_in_threadpool(_remove, str(staged))
+    return UploadPartReceipt(upload_id=upload.id, number=number, size=received, sha256=part_hash)
+
+
+async def complete(upload: UploadSession):
+    """Queue the assembled file for transcription; 400 while parts are missing"""
+    parts = {part.number for part in await received_parts(upload.id)}
+    missing = [number for number in range(1, part_count(upload) + 1) if number not in parts]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Upload is missing parts", "missing_parts": missing[:100]}
+        )
+
+    # Only one completion may queue the file
+    async with SessionLocal() as db:
+        result = await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == upload.id, UploadSession.status == OPEN)
+            .values(status=COMPLETED)
+        )
+        await db.commit()
+    if result.rowcount == 0:
+        raise HTTPException(status_code=409, detail="Upload is already completed")
+
+    # The content hash is computed by the worker, off the request
+    task = await transcription_service.transcribe_audio(
+        upload.id,
+        TranscriptionRequest(file_id=upload.id, language=upload.language, prompt=upload.prompt),
+        file_path=Path(upload.path),
+        filename=upload.filename,
+        user_id=upload.user_id
+    )
+    async with SessionLocal() as db:
+        await db.execute(update(UploadSession).where(UploadSession.id == upload.id).values(task_id=task.task_id))
+        await db.commit()
+    logger.info(f"Upload {upload.id} completed, queued as task {task.task_id}")
+    return task
+
+
+async def abort(upload: UploadSession) -> None:
+    if upload.status != OPEN:
+        raise HTTPException(status_code=409, detail="Upload is already completed")
+    async with SessionLocal() as db:
+        await db.execute(delete(UploadPart).where(UploadPart.upload_id == upload.id))
+        await db.execute(delete(UploadSession).where(UploadSession.id == upload.id))
+        await db.commit()
+    await run_in_threadpool(_remove, upload.path)
+
+
+async def cleanup_expired() -> None:
+    """Delete unfinished uploads past their expiry, with their files"""
+    async with SessionLocal() as db:
+        expired = (await db.execute(
+            select(UploadSession.id, UploadSession.path).where(
+                UploadSession.status == OPEN, UploadSession.expires_at < datetime.utcnow()
+            )
+        )).all()
+        if not expired:
+            return
+        ids = [upload.id for upload in expired]
+        await db.execute(delete(UploadPart).where(UploadPart.upload_id.in_(ids)))
+        await db.execute(delete(UploadSession).where(UploadSession.id.in_(ids)))
+        await db.commit()
+    for upload in expired:
+        logger.info(f"Removing expired upload {upload.id}")
+        await run_in_threadpool(_remove, upload.path)
@@ -1,17 +1,26 @@
 import os
+import re
 import json
+from io import BytesIO
+from functools import lru_cache
 from pathlib import Path
-from docx import Document
-from fpdf import FPDF
-from jinja2 import Template
+from typing import Iterable, Iterator, Tuple
 import logging
 
 from app.utils import document_converter
 
 logger = logging.getLogger(__name__)
 
+COVER_IMAGE = 'images/cover.png'
+HEADER_LOGO = 'images/GFT_Logo_RGB.png'
+
+# python-docx, fpdf and jinja2 are imported inside the functions that use
+# them: DOCX and PDF are only built in the render worker processes, so the
+# web process never pays for loading them
+
 def text_to_docx(text: str, output_path: Path) -> Path:
     """Convert plain text to DOCX format"""
+    from docx import Document
     try:
         doc = Document()
         doc.add_heading('Transcription', level=1)
@@ -27,8 +36,8 @@ def text_to_docx(text: str, output_path: Path) -> Path:
 
 def text_to_pdf(text: str, output_path: Path) -> Path:
     """Convert plain text to PDF format"""
+    from fpdf import FPDF
     try:
-        print(f"DEBUG: text_to_pdf received text: {repr(text[:100])}")  # Show first 100 chars
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", 'B', 16)
@@ -46,10 +55,7 @@ def text_to_pdf(text: str, output_path: Path) -> Path:
         logger.error(f"Error creating PDF document: {str(e)}")
         raise
 
-def text_to_html(text: str, output_path: Path) -> Path:
-    """Convert plain text to HTML format"""
-    try:
-        html_template = """
+HTML_TEMPLATE_SOURCE = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -68,12 +74,189 @@ def text_to_html(text: str, output_path: Path) -> Path:
         </body>
         </html>
         """
-        template = Template(html_template)
-        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-        html_content = template.render(paragraphs=paragraphs)
+
+@lru_cache(maxsize=1)
+def html_template():
+    """The HTML template, compiled once per process instead of on every export"""
+    from jinja2 import Template
+    return Template(HTML_TEMPLATE_SOURCE)
+
+# Sections produced by the LLM sectioning pass: [TITLE]\nText...
+SECTION_PATTERN = re.compile(r"\[(.*?)\]\n(.*?)(?=\n\[|$)", re.DOTALL)
+
+def iter_html(text: str) -> Iterator[str]:
+    """Render text to HTML incrementally, paragraph by paragraph"""
+    paragraphs = (p.strip() for p in text.split('\n\n') if p.strip())
+    return html_template().generate(paragraphs=paragraphs)
+
+def text_to_html(text: str, output_path: Path) -> Path:
+    """Convert plain text to HTML format"""
+    try:
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            f.writelines(iter_html(text))
         return output_path
     except Exception as e:
         logger.error(f"Error creating HTML document: {str(e)}")
+        raise
+
+def _timestamp(seconds: float, separator: str) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def iter_srt(cues: Iterable[Tuple[float, float, str]]) -> Iterator[str]:
+    """Render (start, end, text) cues as SubRip, one cue at a time"""
+    for index, (start, end, text) in enumerate(cues, start=1):
+        yield f"{index}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n\n"
+
+def iter_vtt(cues: Iterable[Tuple[float, float, str]]) -> Iterator[str]:
+    """Render (start, end, text) cues as WebVTT, one cue at a time"""
+    yield "WEBVTT\n\n"
+    for start, end, text in cues:
+        yield f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text}\n\n"
+
+def add_toc(paragraph):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    fldSimple = OxmlElement('w:fldSimple')
+    fldSimple.set(qn('w:instr'), 'TOC \\o "1-3" \\h \\z \\u')
+    paragraph._p.append(fldSimple)
+
+def new_branded_document():
+    """Build the GFT-branded base document (cover, header logo, TOC) from scratch"""
+    from docx import Document
+    from docx.enum.section import WD_SECTION
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches
+    doc = Document()
+
+    # --- COVER PAGE (Section 1, margins 0) ---
+    section = doc.sections[0]
+    section.top_margin = Inches(0)
+    section.bottom_margin = Inches(0)
+    section.left_margin = Inches(0)
+    section.right_margin = Inches(0)
+
+    # Añade la imagen de portada
+    p = doc.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = p.add_run()
+    run.add_picture(COVER_IMAGE, width=Inches(8.27), height=Inches(10.5))
+
+    # Añade un párrafo vacío después de la imagen (opcional)
+    doc.add_paragraph("")
+
+    # Añade el salto de página SOLO después de tener contenido
+    doc.add_page_break()
+
+    # Añade una nueva sección para el contenido principal
+    doc.add_section(WD_SECTION.NEW_PAGE)
+
+    # Ahora puedes acceder a la sección 1 (índice 1)
+    main_section = doc.sections[1]
+    main_section.top_margin = Inches(1)
+    main_section.bottom_margin = Inches(1)
+    main_section.left_margin = Inches(1)
+    main_section.right_margin = Inches(1)
+
+    # Añade el logo en el header de la sección principal
+    header = main_section.header
+    header_paragraph = header.paragraphs[0]
+    header_run = header_paragraph.add_run()
+    header_run.add_picture(HEADER_LOGO, width=Inches(1.0))
+
+    # Table of Contents
+    doc.add_paragraph('Tabla de Contenidos', style='Heading 1')
+    toc_paragraph = doc.add_paragraph()
+    add_toc(toc_paragraph)
+    doc.add_page_break()
+    return doc
+
+@lru_cache(maxsize=1)
+def branded_skeleton() -> bytes:
+    """The branded base document, built once per process and kept as saved DOCX bytes"""
+    logger.info("Building branded DOCX skeleton")
+    buffer = BytesIO()
+    new_branded_document().save(buffer)
+    return buffer.getvalue()
+
+@lru_cache(maxsize=1)
+def branded_parts():
+    """
+    The skeleton unpacked once per process: a package reader holding every
+    part's bytes, images included, and the parsed XML of each XML part
+    """
+    from docx.opc.part import PartFactory, XmlPart
+    from docx.opc.pkgreader import PackageReader
+    from docx.oxml import parse_xml
+    reader = PackageReader.from_file(BytesIO(branded_skeleton()))
+    elements = {}
+    for partname, content_type, _, blob in reader.iter_sparts():
+        part_cls = PartFactory._part_cls_for(content_type)
+        if issubclass(part_cls, XmlPart):
+            elements[partname] = (part_cls, parse_xml(blob))
+    return reader, elements
+
+def clone_branded_document():
+    """
+    Fresh branded document for one export, assembled from the unpacked
+    skeleton: binary parts share the cached bytes and XML parts get a copy
+    of the parsed tree, so nothing is unzipped or parsed per export. Not a
+    deepcopy of a Document: python-docx caches proxies into the XML tree,
+    which a copy would leave detached.
+    """
+    import copy
+    from docx.opc.package import Unmarshaller
+    from docx.opc.part import PartFactory
+    from docx.package import Package
+    reader, elements = branded_parts()
+
+    def load_part(partname, content_type, reltype, blob, package):
+        if partname in elements:
+            part_cls, element = elements[partname]
+            return part_cls(partname, content_type, copy.deepcopy(element), package)
+        return PartFactory(partname, content_type, reltype, blob, package)
+
+    package = Package()
+    Unmarshaller.unmarshal(reader, package, load_part)
+    return package.main_document_part.document
+
+def load_templates() -> None:
+    """Build document templates ahead of the first export"""
+    branded_parts()
+
+def text_to_branded_docx(sectioned_text: str, output_path: Path) -> Path:
+    """Build the GFT-branded DOCX (cover, header logo, TOC) from sectioned text"""
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+    try:
+        doc = clone_branded_document()
+
+        matches = SECTION_PATTERN.findall(sectioned_text)
+
+        if not matches:
+            # fallback: just add the text as a single section
+            doc.add_heading('Transcripción de Video', level=1)
+            paragraph = doc.add_paragraph(sectioned_text or "Sin texto")
+            paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+            for run in paragraph.runs:
+                run.font.name = 'Noto Sans'
+                run.font.size = Pt(12)
+        else:
+            for title, content in matches:
+                heading = doc.add_heading(title.strip(), level=1)
+                heading.runs[0].font.name = 'Arial'
+                heading.runs[0].font.size = Pt(18)
+                paragraph = doc.add_paragraph(content.strip())
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+                for run in paragraph.runs:
+                    run.font.name = 'Noto Sans'
+                    run.font.size = Pt(12)
+
+        doc.save(output_path)
+        return output_path
+    except Exception as e:
+        logger.error(f"Error creating DOCX document: {str(e)}")
         raise
\ No newline at end of file
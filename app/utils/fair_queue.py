@@ -0,0 +1,40 @@
+"""
+Round-robin queue over lanes.
+
+Items are put with a lane key and get() takes one item from each
+non-empty lane in turn, so fifty files queued by one batch interleave with
+later single uploads instead of running ahead of all of them. Within a lane
+order is FIFO. Same interface as asyncio.Queue for the parts the workers
+use: put_nowait, get, task_done, qsize.
+"""
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class FairQueue(Generic[T]):
+    def __init__(self):
+        # lane -> pending items; a lane moves to the back after serving one
+        self._lanes: "OrderedDict[Hashable, Deque[T]]" = OrderedDict()
+        # One token per pending item: waiting and task_done come from here
+        self._tokens: asyncio.Queue = asyncio.Queue()
+
+    def qsize(self) -> int:
+        return self._tokens.qsize()
+
+    def put_nowait(self, item: T, lane: Hashable = None) -> None:
+        self._lanes.setdefault(lane, deque()).append(item)
+        self._tokens.put_nowait(None)
+
+    async def get(self) -> T:
+        await self._tokens.get()
+        lane, items = self._lanes.popitem(last=False)
+        item = items.popleft()
+        if items:
+            self._lanes[lane] = items
+        return item
+
+    def task_done(self) -> None:
+        self._tokens.task_done()
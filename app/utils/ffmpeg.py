@@ -0,0 +1,57 @@
+import json
+import asyncio
+import logging
+from pathlib import Path
+from typing import Tuple
+import app.config as config
+
+logger = logging.getLogger(__name__)
+
+
+class FFmpegError(RuntimeError):
+    pass
+
+
+async def run(binary: str, *args: str) -> Tuple[bytes, bytes]:
+    """Run an ffmpeg/ffprobe command as an asyncio subprocess"""
+    process = await asyncio.create_subprocess_exec(
+        binary, *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        message = stderr.decode(errors="replace").strip().splitlines()
+        raise FFmpegError(f"{Path(binary).name} failed: {message[-1] if message else process.returncode}")
+    return stdout, stderr
+
+
+async def ffmpeg(*args: str) -> bytes:
+    """Run ffmpeg and return its stderr, where filters report their output"""
+    _, stderr = await run(config.FFMPEG_BINARY, "-hide_banner", "-nostdin", "-y", *args)
+    return stderr
+
+
+async def probe(path: Path) -> dict:
+    """Return ffprobe's format and stream information for a media file"""
+    stdout, _ = await run(
+        config.FFPROBE_BINARY,
+        "-v", "error",
+        "-show_format", "-show_streams",
+        "-of", "json",
+        str(path)
+    )
+    return json.loads(stdout)
+
+
+async def probe_duration(path: Path) -> float:
+    """Duration of a media file in seconds; FFmpegError if unknown or not positive"""
+    info = await probe(path)
+    try:
+        duration = float(info["format"]["duration"])
+    except (KeyError, TypeError, ValueError):
+        # Missing, or "N/A" for streams without a known length
+        raise FFmpegError(f"ffprobe reported no duration for {path.name}")
+    if not duration > 0:
+        raise FFmpegError(f"ffprobe reported a duration of {duration} for {path.name}")
+    return duration
@@ -1,49 +1,291 @@
 import os
 import uuid
-import shutil
-from fastapi import UploadFile, HTTPException
-from ..config import settings
+import hashlib
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+import app.config as config
 
-async def save_upload_file(file: UploadFile) -> str:
-    """
-    Save an uploaded file to the uploads directory
-    Returns the file path
-    """
-    # Validate file size
-    file.file.seek(0, os.SEEK_END)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    
-    if file_size > settings.MAX_FILE_SIZE:
+# Boundaries and part headers on top of the file bytes of a multipart body
+MULTIPART_OVERHEAD = 64 * 1024
+MULTIPART_MAX_FIELD_SIZE = 64 * 1024
+
+
+class SavedUpload(BaseModel):
+    file_id: str
+    path: Path
+    extension: str
+    size: int
+    sha256: str
+
+
+def is_valid_id(file_id: str) -> bool:
+    """file_id is a canonical uuid, as generated for uploads, and safe to put in a path"""
+    try:
+        return str(uuid.UUID(file_id)) == file_id
+    except (ValueError, TypeError):
+        return False
+
+
+def validate_extension(filename: Optional[str], formats: List[str] = config.SUPPORTED_FORMATS) -> str:
+    """Return the lowercased extension of filename, or raise 400 if not in formats"""
+    file_ext = Path(filename or "").suffix.lower()
+    if file_ext not in formats:
         raise HTTPException(
-            status_code=413, 
-            detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE/1024/1024}MB"
+            status_code=400,
+            detail=f"Unsupported file format. Supported formats: {', '.join(formats)}"
         )
-    
-    # Generate a unique filename to prevent collisions
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    
-    # Validate file extension
-    if (file_extension not in settings.SUPPORTED_VIDEO_FORMATS and 
-        file_extension not in settings.SUPPORTED_AUDIO_FORMATS):
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file format. Supported formats are: {', '.join(settings.SUPPORTED_VIDEO_FORMATS + settings.SUPPORTED_AUDIO_FORMATS)}"
+    return file_ext
+
+
+class StreamedFile(BaseModel):
+    field: str
+    filename: str
+    upload: SavedUpload
+
+
+class MultipartUpload(BaseModel):
+    fields: Dict[str, str]
+    files: List[StreamedFile]
+
+    def field(self, name: str) -> Optional[str]:
+        return self.fields.get(name) or None
+
+
+class _FilePart:
+    """A file part being written: chunks are buffered to UPLOAD_CHUNK_SIZE per thread hop"""
+
+    def __init__(self, field: str, filename: str, extension: str, dest_dir: Path):
+        self.field = field
+        self.filename = filename
+        self.file_id = str(uuid.uuid4())
+        self.extension = extension
+        self.path = dest_dir / f"{self.file_id}{extension}"
+        self.handle = open(self.path, "wb")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.buffer = bytearray()
+
+    async def flush(self) -> None:
+        if self.buffer:
+            await run_in_threadpool(self.handle.write, bytes(self.buffer))
+            self.buffer.clear()
+
+    def saved(self) -> StreamedFile:
+        upload = SavedUpload(
+            file_id=self.file_id, path=self.path, extension=self.extension,
+            size=self.size, sha256=self.digest.hexdigest()
         )
-    
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-    
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    return unique_filename
+        return StreamedFile(field=self.field, filename=self.filename, upload=upload)
+
+
+async def stream_multipart_to_disk(
+    request: Request,
+    formats: List[str] = config.SUPPORTED_FORMATS,
+    max_size: int = config.MAX_FILE_SIZE,
+    max_total: int = config.MAX_FILE_SIZE,
+    max_files: int = 1,
+    dest_dir: Path = config.UPLOAD_DIR
+) -> MultipartUpload:
+    """
+    Parse a multipart/form-data request body while it arrives, writing file
+    parts straight to dest_dir and hashing them on the fly. Nothing is
+    spooled first: a Content-Length above max_total is refused before the
+    body is read, and the extension, max_size per file, max_total and
+    max_files are enforced as the bytes come in, aborting the upload. Form
+    fields are kept in memory, up to MULTIPART_MAX_FIELD_SIZE each.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Upload too large. Maximum size is {max_total/1024/1024}MB"
+    )
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_total + MULTIPART_OVERHEAD:
+        raise too_large
+
+    # The parser calls back synchronously; events are handled after each write
+    events: list = []
+    callbacks = {
+        "on_part_begin": lambda: events.append(("begin", None)),
+        "on_header_field": lambda data, start, end: events.append(("header_field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("header_value", data[start:end])),
+        "on_header_end": lambda: events.append(("header_end", None)),
+        "on_headers_finished": lambda: events.append(("headers", None)),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", None)),
+    }
+    parser = MultipartParser(boundary, callbacks)
+
+    fields: Dict[str, str] = {}
+    files: List[StreamedFile] = []
+    headers: Dict[bytes, bytes] = {}
+    header_field = b""
+    header_value = b""
+    name = ""
+    part: Optional[_FilePart] = None
+    value = bytearray()
+    received = 0
+
+    async def handle(kind: str, data: bytes) -> None:
+        nonlocal headers, header_field, header_value, name, part, value, received
+        if kind == "begin":
+            headers, value = {}, bytearray()
+        elif kind == "header_field":
+            header_field += data
+        elif kind == "header_value":
+            header_value += data
+        elif kind == "header_end":
+            headers[header_field.lower()] = header_value
+            header_field, header_value = b"", b""
+        elif kind == "headers":
+            _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+            name = disposition.get(b"name", b"").decode(errors="replace")
+            if b"filename" in disposition:
+                filename = disposition[b"filename"].decode(errors="replace")
+                extension = validate_extension(filename, formats)
+                if len(files) == max_files:
+                    raise HTTPException(status_code=400, detail=f"Too many files. Maximum is {max_files}")
+                part = _FilePart(name, filename, extension, dest_dir)
+        elif kind == "data":
+            received += len(data)
+            if received > max_total:
+                raise too_large
+            if part is None:
+                value += data
+                if len(value) > MULTIPART_MAX_FIELD_SIZE:
+                    raise HTTPException(status_code=413, detail=f"Form field {name} is too large")
+                return
+            part.size += len(data)
+            if part.size > max_size:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File too large. Maximum size is {max_size/1024/1024}MB"
+                )
+            part.digest.update(data)
+            part.buffer += data
+            if len(part.buffer) >= config.UPLOAD_CHUNK_SIZE:
+                await part.flush()
+        elif kind == "end":
+            if part is None:
+                fields[name] = value.decode(errors="replace")
+                return
+            await part.flush()
+            await run_in_threadpool(part.handle.close)
+            files.append(part.saved())
+            part = None
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, data in events:
+                await handle(kind, data)
+            events.clear()
+        parser.finalize()
+        if part is not None:
+            raise HTTPException(status_code=400, detail="Incomplete multipart body")
+    except BaseException as e:
+        # Never leave a partial upload behind
+        if part is not None:
+            part.handle.close()
+            if part.path.exists():
+                os.remove(part.path)
+        remove_saved(file.upload for file in files)
+        if isinstance(e, MultipartParseError):
+            raise HTTPException(status_code=400, detail=f"Invalid multipart body: {str(e)}")
+        raise
+
+    return MultipartUpload(fields=fields, files=files)
+
+
+def extract_archive(
+    archive_path: Path,
+    max_files: int,
+    max_bytes: int,
+    dest_dir: Path = config.UPLOAD_DIR
+) -> List[Tuple[str, SavedUpload]]:
+    """
+    Copy the supported media files of a ZIP archive to dest_dir and return
+    them as (member name, SavedUpload); other members are skipped. Blocking,
+    so run it in a thread. Limits are checked on the bytes actually read in
+    UPLOAD_CHUNK_SIZE blocks, not on the sizes the archive declares: each
+    member against MAX_FILE_SIZE and ARCHIVE_MAX_RATIO times its compressed
+    size, all of them together against max_bytes.
+    """
+    total = 0
+    saved: List[Tuple[str, SavedUpload]] = []
+    partial: Optional[Path] = None
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                name = Path(member.filename).name
+                file_ext = Path(name).suffix.lower()
+                if member.is_dir() or name.startswith(".") or file_ext not in config.SUPPORTED_FORMATS:
+                    continue
+                if len(saved) == max_files:
+                    raise HTTPException(status_code=400, detail=f"Too many files. Maximum is {max_files} per batch")
+
+                file_id = str(uuid.uuid4())
+                partial = dest_dir / f"{file_id}{file_ext}"
+                digest = hashlib.sha256()
+                size = 0
+                with archive.open(member) as source, open(partial, "wb") as buffer:
+                    while True:
+                        chunk = source.read(config.UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        total += len(chunk)
+                        if size > config.MAX_FILE_SIZE:
+                            raise HTTPException(
+                                status_code=413,
+                                detail=f"{name} is too large. Maximum size is {config.MAX_FILE_SIZE/1024/1024}MB"
+                            )
+                        if size > max(member.compress_size, 1) * config.ARCHIVE_MAX_RATIO:
+                            raise HTTPException(
+                                status_code=400,
+                                detail=f"{name} expands more than {config.ARCHIVE_MAX_RATIO}x; archive rejected"
+                            )
+                        if total > max_bytes:
+                            raise HTTPException(
+                                status_code=413,
+                                detail=f"Batch too large. Maximum is {config.BATCH_MAX_BYTES/1024/1024}MB in total"
+                            )
+                        digest.update(chunk)
+                        buffer.write(chunk)
+                saved.append((name, SavedUpload(
+                    file_id=file_id, path=partial, extension=file_ext, size=size, sha256=digest.hexdigest()
+                )))
+                partial = None
+    except BaseException as e:
+        if partial is not None and partial.exists():
+            os.remove(partial)
+        remove_saved(upload for _, upload in saved)
+        if isinstance(e, (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError)):
+            raise HTTPException(status_code=400, detail=f"Invalid archive: {str(e)}")
+        raise
+    return saved
+
+
+def remove_saved(uploads: Iterable[SavedUpload]) -> None:
+    """Delete saved uploads that will not be transcribed"""
+    for upload in uploads:
+        if upload.path.exists():
+            os.remove(upload.path)
+
 
 def get_file_path(file_id: str) -> str:
     """Get the full path to a file by its ID"""
-    for filename in os.listdir(settings.UPLOAD_DIR):
+    for filename in os.listdir(config.UPLOAD_DIR):
         if filename.startswith(file_id):
-            return os.path.join(settings.UPLOAD_DIR, filename)
-    
-    raise HTTPException(status_code=404, detail="File not found")
\ No newline at end of file
+            return os.path.join(config.UPLOAD_DIR, filename)
+
+    raise HTTPException(status_code=404, detail="File not found")
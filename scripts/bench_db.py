@@ -0,0 +1,124 @@
+"""
+Benchmark request-shaped database throughput for different engine settings.
+
+Usage:
+    python scripts/bench_db.py [--url URL] [--requests 2000] [--concurrency 32]
+
+Each simulated request opens a session, runs the lookups an authenticated
+transcript request does (session token -> user, file_id -> owner) and
+closes it, with --concurrency requests in flight. Compared configurations:
+    echo     the previous engine: echo=True, default pool (5 + 10 overflow)
+    default  create_engine() with the DB_* settings
+Without --url a temporary SQLite file is used; pass a postgresql+asyncpg
+URL (e.g. a local Postgres) to see pool and statement cache effects.
+Echo output is discarded, so only its formatting cost is measured.
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import delete  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.db import Base, create_engine, get_pool_stats  # noqa: E402
+from app.models.session import UserSession  # noqa: E402
+from app.models.transcription import Transcription  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+SEED_ROWS = 200
+
+
+async def seed(engine, run_id: str) -> list:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(bind=engine, class_=AsyncSession)
+    async with Session() as db:
+        user = User(username=f"bench-{run_id}", email=f"bench-{run_id}@example.com", password_hash="-")
+        db.add(user)
+        await db.flush()
+        pairs = []
+        for i in range(SEED_ROWS):
+            token_hash = f"{run_id}-{i}"
+            file_id = f"{run_id}-{i}"
+            db.add(UserSession(token_hash=token_hash, user_id=user.id, expires_at=datetime.utcnow() + timedelta(hours=1)))
+            db.add(Transcription(file_id=file_id, user_id=user.id, filename="bench.mp3", text="-"))
+            pairs.append((token_hash, file_id))
+        await db.commit()
+    return pairs
+
+
+async def cleanup(engine, run_id: str) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(delete(UserSession).where(UserSession.token_hash.like(f"{run_id}-%")))
+        await conn.execute(delete(Transcription).where(Transcription.file_id.like(f"{run_id}-%")))
+        await conn.execute(delete(User).where(User.username == f"bench-{run_id}"))
+
+
+async def run(engine, pairs: list, requests: int, concurrency: int) -> float:
+    Session = sessionmaker(bind=engine, class_=AsyncSession)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(i: int) -> None:
+        token_hash, file_id = pairs[i % len(pairs)]
+        async with semaphore, Session() as db:
+            await db.execute(
+                select(UserSession.expires_at, User.id, User.username)
+                .join(User, User.id == UserSession.user_id)
+                .where(UserSession.token_hash == token_hash)
+            )
+            await db.execute(select(Transcription.user_id).where(Transcription.file_id == file_id))
+
+    # Warm-up: open connections and fill statement caches
+    await asyncio.gather(*(request(i) for i in range(concurrency)))
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    return time.perf_counter() - start
+
+
+async def bench(url: str, requests: int, concurrency: int) -> None:
+    run_id = uuid.uuid4().hex[:8]
+    previous = {"echo": True, "pool_pre_ping": False, "pool_recycle": -1}
+    if not url.startswith("sqlite"):
+        previous.update(pool_size=5, max_overflow=10)
+    configurations = {"echo": previous, "default": {}}
+    for name, overrides in configurations.items():
+        # echo=True binds its log handler to stdout when the engine is created
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            engine = create_engine(url, **overrides)
+            pairs = await seed(engine, run_id)
+            elapsed = await run(engine, pairs, requests, concurrency)
+            stats = get_pool_stats(engine)
+            await cleanup(engine, run_id)
+            await engine.dispose()
+        print(
+            f"{name:8} {requests / elapsed:8.0f} req/s  "
+            f"connects {stats['connects']:3}  max checked out {stats['max_checked_out']:3}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="database URL, default a temporary SQLite file")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite+aiosqlite:///{tmp}/bench.db"
+        asyncio.run(bench(url, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
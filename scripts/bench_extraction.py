@@ -0,0 +1,70 @@
+"""
+Benchmark audio extraction: legacy moviepy path vs. the ffmpeg engine.
+
+Usage:
+    python scripts/bench_extraction.py sample1.mp4 sample2.mkv ... [--runs 3]
+
+Each file is extracted --runs times with both methods; the best wall time,
+the output size and the speedup are printed per file. Requires ffmpeg and
+ffprobe on PATH (or FFMPEG_BINARY/FFPROBE_BINARY) and moviepy for the
+legacy path.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.services import extraction  # noqa: E402
+
+
+def moviepy_extract(video_path: Path, audio_path: Path) -> Path:
+    """The extraction code /transcribe/ used before the ffmpeg engine"""
+    from moviepy.editor import VideoFileClip
+    video = VideoFileClip(str(video_path))
+    video.audio.write_audiofile(str(audio_path), logger=None)
+    video.close()
+    return audio_path
+
+
+def best_of(runs: int, func) -> tuple:
+    best = None
+    output = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'file':<32} {'moviepy s':>10} {'ffmpeg s':>10} {'speedup':>8} {'mp MB':>7} {'ff MB':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        for video_path in args.files:
+            legacy_time, legacy_out = best_of(
+                args.runs, lambda: moviepy_extract(video_path, tmp_dir / "moviepy.mp3")
+            )
+            engine_time, engine_out = best_of(
+                args.runs, lambda: asyncio.run(extraction.extract_audio(video_path, tmp_dir / "ffmpeg"))
+            )
+            print(
+                f"{video_path.name[:32]:<32} {legacy_time:>10.2f} {engine_time:>10.2f} "
+                f"{legacy_time / engine_time:>7.1f}x "
+                f"{legacy_out.stat().st_size / 1e6:>7.1f} {engine_out.stat().st_size / 1e6:>7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
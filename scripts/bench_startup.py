@@ -0,0 +1,128 @@
+"""
+Benchmark cold start: import time per module and time to first request.
+
+Usage:
+    python scripts/bench_startup.py [--runs 3] [--top 15] [--max-import-ms 2500]
+
+Each run starts a fresh interpreter, so nothing is served from a warm
+module cache:
+    import   python -X importtime -c "import app.main", reporting the
+             total and the slowest top-level packages (cumulative)
+    serve    uvicorn app.main:app on a free port, timing from process
+             spawn until GET /metrics/db-pool answers 200
+Also lists heavy packages (openai, docx, fpdf, ...) that app.main imports
+eagerly. With --max-import-ms, exits with status 1 if the median import
+time exceeds it, so a regression can fail CI.
+Needs OPENAI_API_KEY and DATABASE_URL like the app (defaults: a dummy key
+and a temporary SQLite file).
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROBE_PATH = "/metrics/db-pool"
+# Must only be imported on first use, see app.services.openai_client and
+# app.utils.document_converter
+LAZY_PACKAGES = ["openai", "httpx", "docx", "fpdf", "jinja2", "requests"]
+
+
+def measure_imports(env: dict) -> dict:
+    """Cumulative microseconds per imported module for one cold import of app.main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_request(env: dict, timeout: float = 60) -> float:
+    """Seconds from spawning uvicorn until the first successful request"""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{PROBE_PATH}", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-import-ms", type=float)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            "OPENAI_API_KEY": "benchmark",
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/startup.db",
+            **os.environ,
+            "PYTHONPATH": str(ROOT),
+        }
+
+        samples = defaultdict(list)
+        for _ in range(args.runs):
+            for name, cumulative_us in measure_imports(env).items():
+                samples[name].append(cumulative_us)
+        first_request = [measure_first_request(env) for _ in range(args.runs)]
+
+    medians = {name: statistics.median(values) / 1000 for name, values in samples.items()}
+    import_ms = medians["app.main"]
+    top_level = {name: ms for name, ms in medians.items() if "." not in name and name != "app"}
+
+    print(f"import app.main      {import_ms:8.1f} ms (median of {args.runs})")
+    print(f"time to first request {statistics.median(first_request) * 1000:7.1f} ms")
+    print("\nslowest packages (cumulative, first importer pays):")
+    for name, ms in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:24} {ms:8.1f} ms")
+    print("\napp modules:")
+    app_modules = {name: ms for name, ms in medians.items() if name.startswith("app.")}
+    for name, ms in sorted(app_modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:32} {ms:8.1f} ms")
+
+    eager = [name for name in LAZY_PACKAGES if name in medians]
+    if eager:
+        print(f"\nimported eagerly, expected lazy: {', '.join(eager)}")
+
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"\nFAIL: import time {import_ms:.1f} ms exceeds {args.max_import_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark per-export document setup: rebuilt templates vs. precompiled ones.
+
+Usage:
+    python scripts/bench_templates.py [--runs 50]
+
+Measures only the work done before any transcript text is added:
+    docx  building the branded cover/header/TOC document from scratch
+          (re-reading images/) vs. assembling it from the unpacked skeleton
+    html  compiling the Jinja template vs. rendering the precompiled one
+Run from the repository root so images/ resolves.
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from jinja2 import Template  # noqa: E402
+from app.utils import document_converter  # noqa: E402
+
+PARAGRAPHS = ["Lorem ipsum dolor sit amet."] * 20
+
+
+def mean_ms(runs: int, func) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    # Built once, as the render pool initializer does
+    document_converter.load_templates()
+
+    cases = [
+        (
+            "docx",
+            lambda: document_converter.new_branded_document(),
+            lambda: document_converter.clone_branded_document(),
+        ),
+        (
+            "html",
+            lambda: Template(document_converter.HTML_TEMPLATE_SOURCE).render(paragraphs=PARAGRAPHS),
+            lambda: document_converter.html_template().render(paragraphs=PARAGRAPHS),
+        ),
+    ]
+
+    print(f"{'setup':<8} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name, before, after in cases:
+        before_ms = mean_ms(args.runs, before)
+        after_ms = mean_ms(args.runs, after)
+        print(f"{name:<8} {before_ms:>10.2f} {after_ms:>10.2f} {before_ms / after_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
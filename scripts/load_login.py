@@ -0,0 +1,88 @@
+"""
+Load test for /login/: hashing throughput and event loop responsiveness.
+
+    PASSWORD_HASH_WORKERS=4 uvicorn app.main:app --port 8000 &
+    python scripts/load_login.py --logins 64 --base-url http://localhost:8000
+
+Registers a test user (if needed), fires --logins concurrent logins and,
+while they run, probes a cheap endpoint every --probe-interval seconds.
+Prints login throughput and the probe latency percentiles; run the server
+with different PASSWORD_HASH_WORKERS values to see throughput scale with
+cores while the probe latency stays flat.
+"""
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+import httpx
+
+PROBE_PATH = "/export/render/stats"
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(base_url: str, logins: int, probe_interval: float) -> None:
+    email = f"load-{uuid.uuid4().hex[:8]}@example.com"
+    password = "load-test-password"
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        response = await client.post("/register/", data={
+            "nombre": "Load", "apellido": "Test", "email": email, "password": password
+        })
+        response.raise_for_status()
+
+        done = asyncio.Event()
+        probe_latencies = []
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get(PROBE_PATH)
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(probe_interval)
+
+        async def login():
+            response = await client.post("/login/", data={"email": email, "password": password})
+            response.raise_for_status()
+
+        # Baseline probe latency with the server idle
+        await client.get(PROBE_PATH)
+        idle = []
+        for _ in range(20):
+            start = time.perf_counter()
+            await client.get(PROBE_PATH)
+            idle.append(time.perf_counter() - start)
+
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(login() for _ in range(logins)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    print(f"{logins} logins in {elapsed:.2f}s ({logins / elapsed:.1f} logins/s), {len(failures)} failed")
+    print(f"probe {PROBE_PATH} idle:       p50 {statistics.median(idle) * 1000:.1f} ms")
+    if probe_latencies:
+        print(
+            f"probe {PROBE_PATH} under load: p50 {statistics.median(probe_latencies) * 1000:.1f} ms, "
+            f"p99 {percentile(probe_latencies, 0.99) * 1000:.1f} ms, "
+            f"max {max(probe_latencies) * 1000:.1f} ms ({len(probe_latencies)} probes)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.logins, args.probe_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Load test for app.services.openai_client against the local stub.
+
+    uvicorn scripts.openai_stub:app --port 8001 &
+    python scripts/load_openai_client.py --requests 200 --base-url http://localhost:8001/v1
+
+Fires --requests chat completions concurrently through the shared client
+and prints wall time, throughput and the client's latency counters, so
+the concurrency limit and retry/backoff behaviour can be checked offline.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def run(total: int) -> None:
+    from app.services import openai_client
+
+    async def one(i: int):
+        await openai_client.chat(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": f"request {i}"}],
+            max_tokens=16
+        )
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(total)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    await openai_client.close_client()
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s), {len(failures)} failed")
+    print(json.dumps(openai_client.get_metrics(), indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--base-url", default="http://localhost:8001/v1")
+    parser.add_argument("--concurrency", type=int, help="override OPENAI_MAX_CONCURRENCY")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ["OPENAI_BASE_URL"] = args.base_url
+    if args.concurrency:
+        os.environ["OPENAI_MAX_CONCURRENCY"] = str(args.concurrency)
+
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
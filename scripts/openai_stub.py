@@ -0,0 +1,94 @@
+"""
+Local stand-in for the OpenAI endpoints the app uses, for offline tests
+and load tests of the async client.
+
+Run it and point the app at it:
+    uvicorn scripts.openai_stub:app --port 8001
+    OPENAI_BASE_URL=http://localhost:8001/v1 uvicorn app.main:app
+
+Environment:
+    STUB_LATENCY     seconds each call takes (default 0.2)
+    STUB_ERROR_RATE  fraction of calls answered with 429/503 (default 0)
+"""
+import os
+import time
+import random
+import asyncio
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.responses import JSONResponse
+from typing import Optional
+
+LATENCY = float(os.getenv("STUB_LATENCY", 0.2))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", 0))
+
+app = FastAPI(title="OpenAI stub")
+
+
+async def _simulate():
+    """Sleep like a real call and sometimes fail like one"""
+    await asyncio.sleep(LATENCY)
+    if random.random() < ERROR_RATE:
+        status = random.choice([429, 503])
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": "stub failure", "type": "stub", "code": status}},
+            headers={"retry-after": "0.1"}
+        )
+    return None
+
+
+@app.get("/v1/models")
+async def list_models():
+    failure = await _simulate()
+    if failure:
+        return failure
+    return {"object": "list", "data": [{"id": "whisper-1", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(
+    file: UploadFile = File(...),
+    model: str = Form(...),
+    language: Optional[str] = Form(None),
+    prompt: Optional[str] = Form(None),
+    response_format: str = Form("json")
+):
+    size = 0
+    while chunk := await file.read(1024 * 1024):
+        size += len(chunk)
+    failure = await _simulate()
+    if failure:
+        return failure
+
+    text = f"Transcripción de prueba de {file.filename} ({size} bytes)."
+    if response_format == "verbose_json":
+        return {
+            "task": "transcribe",
+            "language": language or "spanish",
+            "duration": 10.0,
+            "text": text,
+            "segments": [
+                {"id": 0, "seek": 0, "start": 0.0, "end": 5.0, "text": text[:len(text) // 2],
+                 "tokens": [], "temperature": 0.0, "avg_logprob": 0.0, "compression_ratio": 1.0, "no_speech_prob": 0.0},
+                {"id": 1, "seek": 0, "start": 5.0, "end": 10.0, "text": text[len(text) // 2:],
+                 "tokens": [], "temperature": 0.0, "avg_logprob": 0.0, "compression_ratio": 1.0, "no_speech_prob": 0.0},
+            ],
+        }
+    return {"text": text}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    failure = await _simulate()
+    if failure:
+        return failure
+    # Echo the user message so length checks downstream pass
+    content = body["messages"][-1]["content"]
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
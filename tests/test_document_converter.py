@@ -0,0 +1,25 @@
+from docx import Document
+
+from app.utils import document_converter
+
+
+def paragraph_texts(path):
+    return [paragraph.text for paragraph in Document(path).paragraphs]
+
+
+def test_branded_docx_keeps_transcript_text(tmp_path):
+    path = document_converter.text_to_branded_docx("[Intro]\nHola mundo.", tmp_path / "out.docx")
+
+    texts = paragraph_texts(path)
+    assert "Intro" in texts
+    assert "Hola mundo." in texts
+    assert "Tabla de Contenidos" in texts
+
+
+def test_branded_docx_exports_do_not_share_content(tmp_path):
+    first = document_converter.text_to_branded_docx("[Uno]\nPrimero.", tmp_path / "first.docx")
+    second = document_converter.text_to_branded_docx("[Dos]\nSegundo.", tmp_path / "second.docx")
+
+    assert "Primero." not in paragraph_texts(second)
+    assert "Segundo." in paragraph_texts(second)
+    assert "Primero." in paragraph_texts(first)